@@ -1,15 +1,22 @@
 #!/usr/bin/python3
-from functools import partial
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 import librosa
-import librosa.display
 import numpy as np
-import matplotlib.pyplot as plt
 import soundfile as sf
 import scipy.signal as sig
 import psola
+import instrumentation
 
 SEMITONES_IN_OCTAVE = 12
+FRAME_LENGTH = 2048
+HOP_LENGTH = FRAME_LENGTH // 4
+YIN_VOICING_THRESHOLD_DB = -40  # Frames quieter than this (relative to the loudest) are unvoiced
+SELECTIVE_COVERAGE_LIMIT = 0.9  # Above this fraction of the signal, vocode it all in one call
+PITCH_TABLE_FMIN = 'C2'
+PITCH_TABLE_FMAX = 'C7'
 
 def degrees_from(scale: str):
     """Return the pitch classes (degrees) that correspond to the given scale"""
@@ -17,12 +24,70 @@ def degrees_from(scale: str):
     degrees = np.concatenate((degrees, [degrees[0] + SEMITONES_IN_OCTAVE]))
     return degrees
 
+def scale_pitch_classes(scale=None):
+    """
+    Pitch classes (0 = C) allowed by a scale.
+
+    scale is a key understood by librosa.key_to_degrees (e.g. 'A:min'), a
+    custom sequence of pitch classes (e.g. [0, 2, 4, 7, 9] for a pentatonic
+    scale), or None for all twelve semitones.
+    """
+    if scale is None:
+        return tuple(range(SEMITONES_IN_OCTAVE))
+    if isinstance(scale, str):
+        degrees = librosa.key_to_degrees(scale)
+    else:
+        degrees = np.asarray(scale, dtype=int)
+    return tuple(sorted(set(int(degree) % SEMITONES_IN_OCTAVE for degree in degrees)))
+
+def pitch_table(scale=None, note_mask=None, fmin=PITCH_TABLE_FMIN, fmax=PITCH_TABLE_FMAX):
+    """
+    Sorted target frequencies of a scale between fmin and fmax, cached per scale.
+
+    Parameters:
+        scale (str or sequence): Key name, custom pitch classes or None (chromatic), see scale_pitch_classes.
+        note_mask (sequence): Twelve booleans indexed by pitch class (0 = C); False removes that note
+            from the targets, e.g. to skip a scale degree the singer should glide through.
+        fmin (str): Lowest note of the table; one extra target is added below it.
+        fmax (str): Highest note of the table; one extra target is added above it.
+
+    Returns:
+        tuple: (targets, boundaries) as read-only arrays. boundaries[i] is the geometric mean of
+        targets[i] and targets[i + 1], i.e. the point halfway between them in semitones.
+    """
+    pitch_classes = scale_pitch_classes(scale)
+    if note_mask is not None:
+        if len(note_mask) != SEMITONES_IN_OCTAVE:
+            raise ValueError(f"note_mask must have {SEMITONES_IN_OCTAVE} entries, got {len(note_mask)}")
+        pitch_classes = tuple(pc for pc in pitch_classes if note_mask[pc])
+    if not pitch_classes:
+        raise ValueError("No notes are enabled in the pitch correction scale")
+    return _build_pitch_table(pitch_classes, fmin, fmax)
+
+@lru_cache(maxsize=None)
+def _build_pitch_table(pitch_classes, fmin, fmax):
+    # One octave of margin on each side so f0 slightly outside the range still snaps to its true neighbour
+    lowest = int(librosa.note_to_midi(fmin)) - SEMITONES_IN_OCTAVE
+    highest = int(librosa.note_to_midi(fmax)) + SEMITONES_IN_OCTAVE
+    midi_notes = np.array([note for note in range(lowest, highest + 1) if note % SEMITONES_IN_OCTAVE in pitch_classes])
+    targets = librosa.midi_to_hz(midi_notes)
+    boundaries = np.sqrt(targets[:-1] * targets[1:])
+    targets.flags.writeable = False
+    boundaries.flags.writeable = False
+    return targets, boundaries
+
+def snap_to_table(f0, table):
+    """Replace every voiced f0 value by the nearest target of a pitch_table (ties go to the lower note)"""
+    targets, boundaries = table
+    f0 = np.asarray(f0, dtype=float)
+    snapped = np.full_like(f0, np.nan)
+    voiced = ~np.isnan(f0)
+    snapped[voiced] = targets[np.searchsorted(boundaries, f0[voiced])]
+    return snapped
+
 def closest_pitch(f0):
     """Round the given pitch values to the nearest MIDI note numbers"""
-    midi_note = np.around(librosa.hz_to_midi(f0))
-    nan_indices = np.isnan(f0)
-    midi_note[nan_indices] = np.nan
-    return librosa.midi_to_hz(midi_note)
+    return snap_to_table(f0, pitch_table())
 
 def closest_pitch_from_scale(f0, scale):
     """Return the pitch closest to f0 that belongs to the given scale"""
@@ -36,43 +101,329 @@ def closest_pitch_from_scale(f0, scale):
     midi_note -= degree_difference
     return librosa.midi_to_hz(midi_note)
 
-def aclosest_pitch_from_scale(f0, scale):
+def aclosest_pitch_from_scale(f0, scale, note_mask=None):
     """Map each pitch in the f0 array to the closest pitch belonging to the given scale."""
-    sanitized_pitch = np.zeros_like(f0)
-    for i in np.arange(f0.shape[0]):
-        sanitized_pitch[i] = closest_pitch_from_scale(f0[i], scale)
+    sanitized_pitch = snap_to_table(f0, pitch_table(scale, note_mask))
     smoothed_sanitized_pitch = sig.medfilt(sanitized_pitch, kernel_size=3)
     smoothed_sanitized_pitch[np.isnan(smoothed_sanitized_pitch)] = \
         sanitized_pitch[np.isnan(smoothed_sanitized_pitch)]
     return smoothed_sanitized_pitch
 
-def autotune(audio, sr, correction_function, plot=False):
-    frame_length = 2048
-    hop_length = frame_length // 4
-    fmin = librosa.note_to_hz('C2')
-    fmax = librosa.note_to_hz('C7')
+def track_pitch_pyin(audio, sr, frame_length, hop_length, fmin, fmax, ref_level=None):
+    """Probabilistic YIN with Viterbi decoding; the reference (and slowest) pitch tracker (ref_level is unused)"""
+    return librosa.pyin(audio,
+                        frame_length=frame_length,
+                        hop_length=hop_length,
+                        sr=sr,
+                        fmin=fmin,
+                        fmax=fmax)
+
+def voicing_reference(audio, frame_length, hop_length):
+    """Loudest frame RMS of the signal, the 0 dB reference of the YIN voicing gate"""
+    return float(librosa.feature.rms(y=audio, frame_length=frame_length, hop_length=hop_length)[0].max())
+
+def file_voicing_reference(input_file, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH, block_duration=30.0):
+    """voicing_reference of an audio file's mono mix, read block by block so memory does not grow with its length"""
+    ref_level = 0.0
+    with sf.SoundFile(input_file) as infile:
+        block_size = max(int(block_duration * infile.samplerate), 2 * frame_length)
+        for block in infile.blocks(blocksize=block_size, overlap=frame_length, dtype='float32', always_2d=True):
+            ref_level = max(ref_level, voicing_reference(block.mean(axis=1), frame_length, hop_length))
+    return ref_level
+
+def track_pitch_yin(audio, sr, frame_length, hop_length, fmin, fmax, ref_level=None):
+    """
+    Plain YIN with an RMS voicing gate, much cheaper than pYIN but without pitch tracking over time.
+
+    The gate is relative to ref_level, the loudest frame RMS of the whole
+    signal; it defaults to that of audio, so segments of a longer signal must
+    be given the reference of the full signal.
+    """
+    f0 = librosa.yin(audio, fmin=fmin, fmax=fmax, sr=sr, frame_length=frame_length, hop_length=hop_length)
+    rms = librosa.feature.rms(y=audio, frame_length=frame_length, hop_length=hop_length)[0]
+    rms_db = librosa.amplitude_to_db(rms, ref=rms.max() if ref_level is None else ref_level)
+    voiced_flag = rms_db[:len(f0)] > YIN_VOICING_THRESHOLD_DB
+    f0[~voiced_flag] = np.nan
+    return f0, voiced_flag, voiced_flag.astype(float)
+
+PITCH_TRACKERS = {
+    'pyin': track_pitch_pyin,
+    'yin': track_pitch_yin,
+}
+
+def track_pitch(audio, sr, frame_length, hop_length, fmin, fmax, pitch_tracker='pyin', ref_level=None):
+    """Run the named pitch tracker and return f0, voiced_flag and voiced_probabilities"""
+    if pitch_tracker not in PITCH_TRACKERS:
+        raise ValueError(f"Unknown pitch tracker '{pitch_tracker}', expected one of {sorted(PITCH_TRACKERS)}")
+    return PITCH_TRACKERS[pitch_tracker](audio, sr, frame_length, hop_length, fmin, fmax, ref_level=ref_level)
+
+def track_pitch_parallel(audio, sr, frame_length, hop_length, fmin, fmax, pitch_tracker='pyin', n_workers=None,
+                         segment_duration=30.0, overlap_duration=2.0, ref_level=None):
+    """
+    Run the pitch tracker on overlapping time segments in a process pool and stitch the results.
+
+    Every segment is analysed with overlap_duration of extra context on both
+    sides so that the Viterbi path of pYIN has settled by the time it reaches
+    the frames that are kept. Segments start on the hop grid, so the stitched
+    arrays have exactly the frames a single-process run would produce.
+    Level-relative voicing gates use ref_level, by default the reference
+    level of the whole signal (see voicing_reference). Workers are spawned rather than forked, since batch runs call this from
+    several threads and a forked child can inherit locks held by the others.
+
+    Parameters:
+        n_workers (int): Number of worker processes (None uses every CPU core, 1 disables the pool).
+        segment_duration (float): Length of the frames kept from each segment in seconds.
+        overlap_duration (float): Context analysed on each side of a segment in seconds.
+        ref_level (float): Voicing gate reference, for signals that are themselves part of a longer one.
+    """
+    n_frames = 1 + len(audio) // hop_length
+    segment_frames = max(int(segment_duration * sr) // hop_length, 1)
+    overlap_frames = int(overlap_duration * sr) // hop_length
+    if n_workers == 1 or n_frames <= segment_frames:
+        return track_pitch(audio, sr, frame_length, hop_length, fmin, fmax, pitch_tracker=pitch_tracker,
+                           ref_level=ref_level)
+
+    f0 = np.full(n_frames, np.nan)
+    voiced_flag = np.zeros(n_frames, dtype=bool)
+    voiced_probabilities = np.zeros(n_frames)
+    if ref_level is None:
+        ref_level = voicing_reference(audio, frame_length, hop_length)
+
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        jobs = []
+        for core_start in range(0, n_frames, segment_frames):
+            core_end = min(core_start + segment_frames, n_frames)
+            start = max(core_start - overlap_frames, 0)
+            end = min(core_end + overlap_frames, n_frames)
+            # Frame j of the segment is centred on global frame start + j
+            end_sample = len(audio) if end == n_frames else (end - 1) * hop_length + 1
+            segment = audio[start * hop_length:end_sample]
+            future = executor.submit(track_pitch, segment, sr, frame_length, hop_length, fmin, fmax,
+                                     pitch_tracker=pitch_tracker, ref_level=ref_level)
+            jobs.append((future, core_start, core_end, start))
+
+        for future, core_start, core_end, start in jobs:
+            segment_f0, segment_voiced_flag, segment_voiced_probabilities = future.result()
+            keep = slice(core_start - start, core_end - start)
+            f0[core_start:core_end] = segment_f0[keep]
+            voiced_flag[core_start:core_end] = segment_voiced_flag[keep]
+            voiced_probabilities[core_start:core_end] = segment_voiced_probabilities[keep]
+
+    return f0, voiced_flag, voiced_probabilities
 
-    f0, voiced_flag, voiced_probabilities = librosa.pyin(audio,
-                                                         frame_length=frame_length,
-                                                         hop_length=hop_length,
-                                                         sr=sr,
-                                                         fmin=fmin,
-                                                         fmax=fmax)
+def correction_regions(f0, corrected_f0, voiced_flag, tolerance_cents=5.0, margin_frames=4):
+    """
+    Frame ranges that need pitch shifting: voiced frames more than tolerance_cents away from their target.
 
-    corrected_f0 = correction_function(f0)
+    Each range is widened by margin_frames on both sides (clipped to the
+    signal) so the vocoder has context and crossfades happen over audio
+    that is already in tune; ranges that touch after widening are merged.
+
+    Returns:
+        list: (start, end) frame ranges, end exclusive.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        deviation = SEMITONES_IN_OCTAVE * 100 * np.abs(np.log2(corrected_f0 / f0))
+    # NaN deviations (unvoiced frames) compare as False
+    needs_shift = np.asarray(voiced_flag, dtype=bool) & (deviation > tolerance_cents)
+    regions = []
+    for frame in np.flatnonzero(needs_shift):
+        start = max(frame - margin_frames, 0)
+        end = min(frame + margin_frames + 1, len(f0))
+        if regions and start <= regions[-1][1]:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    return [tuple(region) for region in regions]
+
+def vocode_regions(audio, sr, corrected_f0, regions, hop_length, fmin, fmax, crossfade=0):
+    """
+    Resynthesize only the given frame regions with PSOLA and crossfade them into the dry audio.
+
+    Frame i is centred on sample i * hop_length, so a region's target pitch
+    lines up with its samples the same way psola spreads a contour over the
+    whole signal. Fades are skipped at the start and end of the signal.
+    """
+    output = np.array(audio, dtype=np.float32, copy=True)
+    for start, end in regions:
+        first = start * hop_length
+        last = len(audio) if end == len(corrected_f0) else min((end - 1) * hop_length + 1, len(audio))
+        segment = audio[first:last]
+        if end - start < 2 or len(segment) == 0:
+            continue
+        vocoded = psola.vocode(segment, sample_rate=int(sr), target_pitch=corrected_f0[start:end], fmin=fmin, fmax=fmax)
+        wet = np.zeros(len(segment), dtype=np.float32)
+        wet[:min(len(vocoded), len(wet))] = vocoded[:len(wet)]
+
+        weight = np.ones(len(segment), dtype=np.float32)
+        fade = min(crossfade, len(segment) // 2)
+        if fade > 0:
+            ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+            if first > 0:
+                weight[:fade] = ramp
+            if last < len(audio):
+                weight[-fade:] = ramp[::-1]
+        output[first:last] = segment * (1 - weight) + wet * weight
+    return output
+
+def analyze_pitch(audio, sr, pitch_tracker='pyin', fmin='C2', fmax='C7', n_workers=1, ref_level=None):
+    """
+    Pitch analysis of a mono signal, independent of the correction applied afterwards.
+
+    ref_level is the voicing gate reference (see track_pitch_yin) when audio is one block of a longer signal.
+
+    Returns:
+        dict: f0 (NaN where unvoiced), voiced_flag and voiced_probabilities per frame, plus the
+        sr, frame_length, hop_length, n_samples, pitch_tracker, fmin and fmax they were computed with.
+    """
+    with instrumentation.stage(f'pitch_tracking_{pitch_tracker}'):
+        f0, voiced_flag, voiced_probabilities = track_pitch_parallel(audio, sr, FRAME_LENGTH, HOP_LENGTH,
+                                                                     librosa.note_to_hz(fmin), librosa.note_to_hz(fmax),
+                                                                     pitch_tracker=pitch_tracker, n_workers=n_workers,
+                                                                     ref_level=ref_level)
+    return {
+        'f0': f0,
+        'voiced_flag': voiced_flag,
+        'voiced_probabilities': voiced_probabilities,
+        'sr': int(sr),
+        'frame_length': FRAME_LENGTH,
+        'hop_length': HOP_LENGTH,
+        'n_samples': len(audio),
+        'pitch_tracker': pitch_tracker,
+        'fmin': fmin,
+        'fmax': fmax,
+    }
+
+def save_pitch_analysis(path, analysis):
+    """Write a pitch analysis as a compressed .npz with float32 contours"""
+    np.savez_compressed(path,
+                        f0=np.asarray(analysis['f0'], dtype=np.float32),
+                        voiced_flag=np.asarray(analysis['voiced_flag'], dtype=bool),
+                        voiced_probabilities=np.asarray(analysis['voiced_probabilities'], dtype=np.float32),
+                        **{key: np.asarray(value) for key, value in analysis.items()
+                           if key not in ('f0', 'voiced_flag', 'voiced_probabilities')})
+
+def load_pitch_analysis(path):
+    """Read a pitch analysis written by save_pitch_analysis"""
+    with np.load(path) as data:
+        analysis = {key: data[key].item() for key in data.files
+                    if key not in ('f0', 'voiced_flag', 'voiced_probabilities')}
+        analysis['f0'] = data['f0'].astype(np.float64)
+        analysis['voiced_flag'] = data['voiced_flag']
+        analysis['voiced_probabilities'] = data['voiced_probabilities'].astype(np.float64)
+    return analysis
+
+def autotune(audio, sr, correction_function, plot=False, pitch_tracker='pyin', fmin='C2', fmax='C7', n_workers=1,
+             selective=False, tolerance_cents=5.0, crossfade_ms=20.0, analysis=None, plot_path='pitch_correction.png',
+             on_plot=None, ref_level=None):
+    """
+    Track the pitch of a mono signal, correct it with correction_function and resynthesize it with PSOLA.
+
+    With selective=True only voiced regions whose pitch is more than
+    tolerance_cents away from the corrected pitch are resynthesized, each
+    crossfaded into the untouched audio over crossfade_ms; silence, breaths
+    and notes that are already in tune pass through unchanged. A previous
+    analyze_pitch result of the same audio, tracker and range can be passed
+    as analysis to skip pitch tracking, e.g. when rendering the same take in
+    several keys.
+    With plot=True the plot data (plotting.pitch_plot_data) is passed to
+    on_plot, e.g. to submit it and keep the Future; without on_plot the plot
+    is written to plot_path in the background (plotting.wait_for_plots).
+    ref_level is passed to analyze_pitch when audio is one block of a longer signal.
+    """
+    hop_length = HOP_LENGTH
+    if analysis is None:
+        analysis = analyze_pitch(audio, sr, pitch_tracker, fmin, fmax, n_workers, ref_level=ref_level)
+    elif analysis['sr'] != int(sr) or analysis['hop_length'] != hop_length or analysis['n_samples'] != len(audio):
+        raise ValueError("Pitch analysis was computed for a different signal, sample rate or hop length")
+    elif (analysis['pitch_tracker'], analysis['fmin'], analysis['fmax']) != (pitch_tracker, fmin, fmax):
+        raise ValueError(f"Pitch analysis was computed with {analysis['pitch_tracker']} from {analysis['fmin']} "
+                         f"to {analysis['fmax']}, not {pitch_tracker} from {fmin} to {fmax}")
+    f0, voiced_flag = analysis['f0'], analysis['voiced_flag']
+    fmin = librosa.note_to_hz(fmin)
+    fmax = librosa.note_to_hz(fmax)
+
+    with instrumentation.stage('pitch_correction'):
+        corrected_f0 = correction_function(f0)
 
     if plot:
-        stft = librosa.stft(audio, n_fft=frame_length, hop_length=hop_length)
-        time_points = librosa.times_like(stft, sr=sr, hop_length=hop_length)
-        log_stft = librosa.amplitude_to_db(np.abs(stft), ref=np.max)
-        fig, ax = plt.subplots()
-        img = librosa.display.specshow(log_stft, x_axis='time', y_axis='log', ax=ax, sr=sr, hop_length=hop_length, fmin=fmin, fmax=fmax)
-        fig.colorbar(img, ax=ax, format="%+2.f dB")
-        ax.plot(time_points, f0, label='original pitch', color='cyan', linewidth=2)
-        ax.plot(time_points, corrected_f0, label='corrected pitch', color='orange', linewidth=1)
-        ax.legend(loc='upper right')
-        plt.ylabel('Frequency [Hz]')
-        plt.xlabel('Time [M:SS]')
-        plt.savefig('pitch_correction.png', dpi=300, bbox_inches='tight')
-
-    return psola.vocode(audio, sample_rate=int(sr), target_pitch=corrected_f0, fmin=fmin, fmax=fmax)
\ No newline at end of file
+        with instrumentation.stage('plot'):
+            # Only the decimated plot data is computed here; the image is drawn on a background thread
+            from plotting import pitch_plot_data, submit_pitch_plot
+            data = pitch_plot_data(audio, sr, f0, corrected_f0, hop_length, fmin, fmax)
+            if on_plot is not None:
+                on_plot(data)
+            else:
+                submit_pitch_plot(plot_path, data)
+
+    with instrumentation.stage('psola') as record:
+        if not selective:
+            return psola.vocode(audio, sample_rate=int(sr), target_pitch=corrected_f0, fmin=fmin, fmax=fmax)
+
+        crossfade = int(crossfade_ms * sr / 1000)
+        margin_frames = -(-crossfade // hop_length) + 2
+        regions = correction_regions(f0, corrected_f0, voiced_flag, tolerance_cents, margin_frames)
+        coverage = sum(end - start for start, end in regions) / max(len(f0), 1)
+        if record is not None:
+            record['resynthesized_fraction'] = coverage
+        if coverage > SELECTIVE_COVERAGE_LIMIT:
+            return psola.vocode(audio, sample_rate=int(sr), target_pitch=corrected_f0, fmin=fmin, fmax=fmax)
+        return vocode_regions(audio, sr, corrected_f0, regions, hop_length, fmin, fmax, crossfade)
+
+def autotune_stream(input_file, output_file, correction_function, block_duration=30.0, overlap_duration=1.0,
+                    pitch_tracker='pyin', fmin='C2', fmax='C7', n_workers=1, selective=False, tolerance_cents=5.0,
+                    crossfade_ms=20.0):
+    """
+    Pitch-correct an audio file block by block so that peak memory does not grow with its duration.
+
+    Each block is read from disk, pitch-tracked and shifted with autotune, and
+    crossfaded with the tail of the previous block over the overlap region
+    before being written out. Multichannel input is mixed down to mono, like
+    librosa.load(..., mono=True). Plotting is not available in this mode.
+    A first pass over the file measures its voicing reference level, so
+    level-relative voicing gates treat every block like the in-memory chain
+    treats the whole take.
+
+    Parameters:
+        input_file (str): Path to the input audio file.
+        output_file (str): Path to save the pitch-corrected mono audio file.
+        correction_function (callable): Maps an f0 array to the target pitch array.
+        block_duration (float): Length of each processed block in seconds.
+        overlap_duration (float): Overlap between consecutive blocks in seconds.
+        pitch_tracker (str): Name of the pitch tracker in PITCH_TRACKERS.
+        fmin (str): Lowest note of the singer's range, e.g. 'C2'.
+        fmax (str): Highest note of the singer's range, e.g. 'C7'.
+        n_workers (int): Worker processes used for pitch detection within each block.
+        selective (bool): Only resynthesize regions that are out of tune, see autotune.
+        tolerance_cents (float): Pitch deviation below which a voiced frame is left untouched.
+        crossfade_ms (float): Crossfade between resynthesized regions and the dry audio.
+    """
+    ref_level = file_voicing_reference(input_file)
+    with sf.SoundFile(input_file) as infile:
+        sr = infile.samplerate
+        block_size = int(block_duration * sr)
+        overlap = int(overlap_duration * sr)
+        if not 0 < overlap < block_size:
+            raise ValueError("overlap_duration must be positive and shorter than block_duration")
+        fade_in = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+
+        with sf.SoundFile(output_file, 'w', samplerate=sr, channels=1) as outfile:
+            tail = None
+            for block in infile.blocks(blocksize=block_size, overlap=overlap, dtype='float32', always_2d=True):
+                audio = block.mean(axis=1)
+                shifted = np.zeros_like(audio)
+                vocoded = autotune(audio, sr, correction_function, pitch_tracker=pitch_tracker,
+                                   fmin=fmin, fmax=fmax, n_workers=n_workers, selective=selective,
+                                   tolerance_cents=tolerance_cents, crossfade_ms=crossfade_ms,
+                                   ref_level=ref_level)[:len(audio)]
+                shifted[:len(vocoded)] = vocoded
+
+                if tail is not None:
+                    # The first `overlap` samples of this block cover the same audio as the previous tail
+                    shifted[:overlap] = tail * (1.0 - fade_in) + shifted[:overlap] * fade_in
+
+                tail = shifted[-overlap:].copy()
+                outfile.write(shifted[:-overlap])
+
+            if tail is not None:
+                outfile.write(tail)
@@ -0,0 +1,162 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from main import main, main_kwargs_from_config, setup_logging
+from scheduler import StageScheduler
+from stage_cache import StageCache
+from video_audio_utils import get_render_profile
+
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.mkv', '.avi', '.webm', '.m4v'}
+
+DEFAULT_LIMITS = {'separation': 1, 'pitch': 2, 'ffmpeg': 2}
+
+
+def load_jobs(source):
+    """
+    Return the per-job config overrides for a directory of videos or a JSON manifest.
+
+    A manifest is either a list of jobs or {"defaults": {...}, "jobs": [...]};
+    each job is a video path or a dict with "video_file" plus any config.json
+    keys to override for that video.
+    """
+    source = Path(source)
+    if source.is_dir():
+        return [{'video_file': str(path)} for path in sorted(source.iterdir())
+                if path.suffix.lower() in VIDEO_EXTENSIONS and not path.stem.endswith('_standardized')]
+
+    with open(source, 'r') as manifest_file:
+        manifest = json.load(manifest_file)
+    if isinstance(manifest, list):
+        manifest = {'jobs': manifest}
+    defaults = manifest.get('defaults', {})
+    jobs = []
+    for job in manifest['jobs']:
+        if isinstance(job, str):
+            job = {'video_file': job}
+        jobs.append({**defaults, **job})
+    return jobs
+
+
+def run_batch(jobs, config, limits=None, max_jobs=None, report_path='batch_report.json'):
+    """
+    Process every job through main, overlapping stages of different videos.
+
+    Jobs run concurrently (max_jobs at a time) and share one StageCache, while
+    the StageScheduler caps each kind of stage separately: Demucs, the vocal
+    chain and ffmpeg encodes. Render profiles with threads=0 (ffmpeg's own
+    choice, one thread per core) get an equal share of the cores per
+    concurrent encode instead. Separations go through one SeparationWorker per
+    separation profile, so each model is loaded once for the whole batch; the
+    report lists every worker's startup time and each job's separation time.
+
+    Parameters:
+        jobs (list): Per-job config overrides, each with at least "video_file".
+        config (dict): Base configuration, as in config.json.
+        limits (dict): Concurrency limit per scheduler resource.
+        max_jobs (int): Videos in flight at once (default: sum of the limits).
+        report_path (str): Where to write the JSON summary report.
+    """
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    scheduler = StageScheduler(limits)
+    cache = StageCache(**(config.get('cache') or {}))
+    max_jobs = max_jobs or sum(limits.values())
+    ffmpeg_threads = max(1, (os.cpu_count() or 1) // limits['ffmpeg']) if limits.get('ffmpeg') else 0
+    workers = {}
+    workers_lock = threading.Lock()
+
+    def separation_worker(profile):
+        from source_separation import SeparationWorker
+        key = json.dumps(profile, sort_keys=True)
+        with workers_lock:
+            if key not in workers:
+                workers[key] = SeparationWorker(profile)
+            return workers[key]
+
+    def run_job(indexed_job):
+        index, overrides = indexed_job
+        job_config = {**config, **overrides}
+        job_id = f"{index}:{job_config['video_file']}"
+        start = time.perf_counter()
+        try:
+            kwargs = main_kwargs_from_config(job_config)
+            render_settings = get_render_profile(kwargs['render_profile'], kwargs['render_profiles'])
+            if not render_settings['threads']:
+                render_settings['threads'] = ffmpeg_threads
+            kwargs['render_profile'] = render_settings
+            main(**kwargs, cache=cache, scheduler=scheduler, job_id=job_id,
+                 separation_worker=separation_worker(kwargs['separation_profile']))
+            status, error = 'ok', None
+        except Exception as e:
+            logging.error(f"Job {job_config['video_file']} failed: {str(e)}")
+            status, error = 'failed', traceback.format_exc()
+        return {
+            'job_id': job_id,
+            'video_file': job_config['video_file'],
+            'status': status,
+            'error': error,
+            'overrides': overrides,
+            'total_time': time.perf_counter() - start,
+        }
+
+    batch_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_jobs) as executor:
+        results = list(executor.map(run_job, enumerate(jobs)))
+    for worker in workers.values():
+        worker.close()
+    if any({**config, **overrides}.get('plot') for overrides in jobs):
+        # Every job waits for its own plot; this only catches those of jobs that failed after submitting one
+        from plotting import wait_for_plots
+        wait_for_plots()
+    cache.evict()
+
+    separation_times = {}
+    for worker in workers.values():
+        separation_times.update(worker.job_times)
+    for result in results:
+        result['stages'] = scheduler.timings.get(result['job_id'], {})
+        # None when the stems came from the stage cache
+        result['separation_s'] = separation_times.get(result['job_id'])
+    report = {
+        'limits': limits,
+        'max_jobs': max_jobs,
+        'separation_workers': [{'profile': worker.profile, 'startup_s': worker.startup_time,
+                                'jobs': len(worker.job_times)} for worker in workers.values()],
+        'total_time': time.perf_counter() - batch_start,
+        'succeeded': sum(result['status'] == 'ok' for result in results),
+        'failed': sum(result['status'] != 'ok' for result in results),
+        'jobs': results,
+    }
+    with open(report_path, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+    logging.info(f"Batch finished: {report['succeeded']} succeeded, {report['failed']} failed. Report: {report_path}")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Process a directory or manifest of videos")
+    parser.add_argument('source', help="Directory of videos or JSON manifest of jobs")
+    parser.add_argument('--config', default='config.json', help="Base configuration")
+    parser.add_argument('--report', default='batch_report.json', help="Summary report path")
+    parser.add_argument('--max-jobs', type=int, help="Videos in flight at once")
+    parser.add_argument('--separation-jobs', type=int, help="Concurrent Demucs separations")
+    parser.add_argument('--pitch-jobs', type=int, help="Concurrent vocal chain (pitch correction) stages")
+    parser.add_argument('--ffmpeg-jobs', type=int, help="Concurrent ffmpeg encodes")
+    args = parser.parse_args()
+
+    setup_logging()
+    with open(args.config, 'r') as config_file:
+        config = json.load(config_file)
+
+    limits = dict(config.get('batch_limits') or {})
+    for resource, value in (('separation', args.separation_jobs), ('pitch', args.pitch_jobs),
+                            ('ffmpeg', args.ffmpeg_jobs)):
+        if value is not None:
+            limits[resource] = value
+
+    run_batch(load_jobs(args.source), config, limits=limits, max_jobs=args.max_jobs, report_path=args.report)
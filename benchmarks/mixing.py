@@ -0,0 +1,69 @@
+"""
+Benchmark the NumPy mixer (mixing.mix_files) against the ffmpeg path (mix_audio_with_ducking).
+
+Both mix the same synthetic vocals, accompaniment and background music from
+WAV files on disk; the in-memory compute time of mix_with_ducking is reported
+separately, together with the level difference between the two outputs.
+
+Run from the repository root:
+    python -m benchmarks.mixing --duration 180
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import soundfile as sf
+from benchmarks.signals import noise, sung_sweep
+from mixing import load_stereo, mix_files, mix_with_ducking
+from video_audio_utils import mix_audio_with_ducking
+
+MIX_PARAMS = dict(vocals_volume=1.0, other_volume=0.9, music_volume=0.8,
+                  ducking_ratio=2.5, ducking_threshold=0.015)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark in-memory mixing against ffmpeg")
+    parser.add_argument('--duration', type=float, default=180.0, help="Length of the test signals in seconds")
+    args = parser.parse_args()
+
+    sr = 44100
+    vocals, _ = sung_sweep(duration=args.duration, sr=sr)
+    other = noise(duration=args.duration, sr=sr, level=0.05, seed=1)
+    music = noise(duration=args.duration, sr=sr, level=0.1, seed=2)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_dir = Path(work_dir)
+        paths = {}
+        for name, audio in (('vocals', vocals), ('other', other), ('music', music)):
+            paths[name] = work_dir / f'{name}.wav'
+            sf.write(str(paths[name]), np.stack([audio, audio]).T, sr, subtype='PCM_16')
+
+        start = time.perf_counter()
+        mix_audio_with_ducking(paths['vocals'], paths['other'], paths['music'], work_dir / 'ffmpeg.wav', **MIX_PARAMS)
+        ffmpeg_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        mix_files(paths['vocals'], paths['other'], work_dir / 'numpy.wav', paths['music'], sr=sr, **MIX_PARAMS)
+        numpy_time = time.perf_counter() - start
+
+        stems = [load_stereo(paths[name], sr) for name in ('vocals', 'other', 'music')]
+        start = time.perf_counter()
+        mix_with_ducking(*stems, sr=sr, **MIX_PARAMS)
+        compute_time = time.perf_counter() - start
+
+        ffmpeg_mix, _ = sf.read(str(work_dir / 'ffmpeg.wav'), always_2d=True)
+        numpy_mix, _ = sf.read(str(work_dir / 'numpy.wav'), always_2d=True)
+        n = min(len(ffmpeg_mix), len(numpy_mix))
+        difference = ffmpeg_mix[:n] - numpy_mix[:n]
+        difference_db = 10 * np.log10(np.mean(difference ** 2) / np.mean(ffmpeg_mix[:n] ** 2))
+
+    print(f"signals: {args.duration:.0f} s")
+    print(f"ffmpeg (files):      {ffmpeg_time:.2f} s")
+    print(f"numpy (files):       {numpy_time:.2f} s")
+    print(f"numpy (in memory):   {compute_time:.2f} s")
+    print(f"difference to ffmpeg: {difference_db:.1f} dB relative to the mix")
+
+
+if __name__ == '__main__':
+    main()
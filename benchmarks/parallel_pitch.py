@@ -0,0 +1,91 @@
+"""
+Check that parallel pitch detection matches the single-process result and report the speedup.
+
+Without --input two synthetic signals are checked: a sung sweep, and the same
+sweep with a loud first half and a quiet second half (QUIET_SECTION_DB below
+it), which catches voicing gates that are relative to each segment's level
+instead of the whole signal's.
+
+Run from the repository root:
+    python -m benchmarks.parallel_pitch --workers 8
+    python -m benchmarks.parallel_pitch --input vocals.wav --tolerance-cents 5
+"""
+import argparse
+import sys
+import time
+import numpy as np
+import librosa
+from auto_tune import track_pitch, track_pitch_parallel
+from benchmarks.signals import sung_sweep
+
+QUIET_SECTION_DB = -50  # Level of the quiet half of the loud/quiet signal relative to the loud half
+
+
+def loud_and_quiet(audio):
+    """The signal with its second half attenuated by QUIET_SECTION_DB"""
+    audio = audio.copy()
+    audio[len(audio) // 2:] *= 10 ** (QUIET_SECTION_DB / 20)
+    return audio
+
+
+def compare(name, audio, sr, args):
+    """Run both pitch detections on audio, print the comparison and return whether it is within tolerance"""
+    frame_length = 2048
+    hop_length = frame_length // 4
+    fmin = librosa.note_to_hz('C2')
+    fmax = librosa.note_to_hz('C7')
+
+    start = time.perf_counter()
+    f0, voiced_flag, _ = track_pitch(audio, sr, frame_length, hop_length, fmin, fmax,
+                                     pitch_tracker=args.pitch_tracker)
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel_f0, parallel_voiced_flag, _ = track_pitch_parallel(
+        audio, sr, frame_length, hop_length, fmin, fmax, pitch_tracker=args.pitch_tracker,
+        n_workers=args.workers, segment_duration=args.segment_duration, overlap_duration=args.overlap_duration)
+    parallel_time = time.perf_counter() - start
+
+    if parallel_f0.shape != f0.shape:
+        print(f"{name}: frame count mismatch: {parallel_f0.shape} != {f0.shape}")
+        return False
+
+    voicing_agreement = np.mean(parallel_voiced_flag == voiced_flag)
+    both_voiced = ~np.isnan(f0) & ~np.isnan(parallel_f0)
+    cents = np.abs(1200 * np.log2(parallel_f0[both_voiced] / f0[both_voiced]))
+    max_cents = cents.max() if cents.size else 0.0
+
+    print(f"{name}: {len(audio) / sr:.1f} s, tracker: {args.pitch_tracker}")
+    print(f"  single process: {single_time:.2f} s")
+    print(f"  parallel:       {parallel_time:.2f} s ({single_time / parallel_time:.1f}x)")
+    print(f"  max pitch difference: {max_cents:.3f} cents, voicing agreement: {voicing_agreement:.4%}")
+    return max_cents <= args.tolerance_cents and voicing_agreement >= args.min_voicing_agreement
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare parallel and single-process pitch detection")
+    parser.add_argument('--input', help="Audio file to analyse (default: synthetic sung sweep)")
+    parser.add_argument('--duration', type=float, default=120.0, help="Length of the synthetic signal in seconds")
+    parser.add_argument('--pitch-tracker', default='pyin')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--segment-duration', type=float, default=30.0)
+    parser.add_argument('--overlap-duration', type=float, default=2.0)
+    parser.add_argument('--tolerance-cents', type=float, default=1.0, help="Maximum allowed pitch difference")
+    parser.add_argument('--min-voicing-agreement', type=float, default=0.999)
+    args = parser.parse_args()
+
+    if args.input:
+        audio, sr = librosa.load(args.input, sr=None, mono=True)
+        signals = [(args.input, audio)]
+    else:
+        sr = 44100
+        audio, _ = sung_sweep(duration=args.duration, sr=sr)
+        signals = [('sung sweep', audio), ('loud/quiet sung sweep', loud_and_quiet(audio))]
+
+    results = [compare(name, audio, sr, args) for name, audio in signals]
+    if not all(results):
+        sys.exit("Stitched pitch track differs from the single-process result beyond tolerance")
+
+
+if __name__ == '__main__':
+    main()
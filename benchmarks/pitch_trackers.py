@@ -0,0 +1,61 @@
+"""
+Compare the speed of every pitch tracker in auto_tune.PITCH_TRACKERS and its pitch error against pYIN.
+
+Run from the repository root:
+    python -m benchmarks.pitch_trackers                      # synthetic sung sweep
+    python -m benchmarks.pitch_trackers --input vocals.wav --fmin E2 --fmax C6
+"""
+import argparse
+import time
+import numpy as np
+import librosa
+from auto_tune import PITCH_TRACKERS, track_pitch
+from benchmarks.signals import sung_sweep
+
+
+def cents_error(reference_f0, f0):
+    """Absolute pitch difference in cents on frames voiced in both tracks."""
+    both_voiced = ~np.isnan(reference_f0) & ~np.isnan(f0)
+    return np.abs(1200 * np.log2(f0[both_voiced] / reference_f0[both_voiced]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pitch trackers against pYIN")
+    parser.add_argument('--input', help="Audio file to analyse (default: synthetic sung sweep)")
+    parser.add_argument('--duration', type=float, default=20.0, help="Length of the synthetic signal in seconds")
+    parser.add_argument('--fmin', default='C2', help="Lowest note of the singer's range")
+    parser.add_argument('--fmax', default='C7', help="Highest note of the singer's range")
+    args = parser.parse_args()
+
+    if args.input:
+        audio, sr = librosa.load(args.input, sr=None, mono=True)
+    else:
+        sr = 44100
+        audio, _ = sung_sweep(duration=args.duration, sr=sr)
+
+    frame_length = 2048
+    hop_length = frame_length // 4
+    fmin = librosa.note_to_hz(args.fmin)
+    fmax = librosa.note_to_hz(args.fmax)
+    audio_duration = len(audio) / sr
+
+    results = {}
+    for name in PITCH_TRACKERS:
+        start = time.perf_counter()
+        f0, voiced_flag, _ = track_pitch(audio, sr, frame_length, hop_length, fmin, fmax, pitch_tracker=name)
+        results[name] = (time.perf_counter() - start, f0, voiced_flag)
+
+    _, reference_f0, reference_voiced = results['pyin']
+    print(f"audio: {audio_duration:.1f} s, range {args.fmin}-{args.fmax}")
+    print(f"{'tracker':<8} {'time [s]':>9} {'RTF':>7} {'median err [c]':>15} {'p95 err [c]':>12} {'voicing agree':>14}")
+    for name, (elapsed, f0, voiced_flag) in results.items():
+        n = min(len(f0), len(reference_f0))
+        errors = cents_error(reference_f0[:n], f0[:n])
+        median = np.median(errors) if errors.size else float('nan')
+        p95 = np.percentile(errors, 95) if errors.size else float('nan')
+        agreement = np.mean(voiced_flag[:n] == reference_voiced[:n])
+        print(f"{name:<8} {elapsed:>9.2f} {elapsed / audio_duration:>7.3f} {median:>15.1f} {p95:>12.1f} {agreement:>14.1%}")
+
+
+if __name__ == '__main__':
+    main()
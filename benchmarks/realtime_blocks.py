@@ -0,0 +1,67 @@
+"""
+Drive the low-latency RealtimeVocalProcessor block by block from a file and time every block against its deadline.
+
+A block of block_size samples has block_size / sr seconds to be processed
+in a live setting; the report shows how much of that budget each block
+used and how many blocks missed it. Without --input a synthetic sung sweep
+is used.
+
+Run from the repository root:
+    python -m benchmarks.realtime_blocks --input vocals.wav --block-size 256 --scale A:min --output preview.wav
+"""
+import argparse
+import time
+from pathlib import Path
+import numpy as np
+import librosa
+import soundfile as sf
+from benchmarks.signals import sung_sweep
+from realtime import RealtimeVocalProcessor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-block timing of the real-time vocal processor")
+    parser.add_argument('--input', help="Vocal file (default: 20 s synthetic sung sweep)")
+    parser.add_argument('--output', help="Write the processed audio here")
+    parser.add_argument('--sr', type=int, default=44100)
+    parser.add_argument('--block-size', type=int, nargs='+', default=[256, 512, 1024])
+    parser.add_argument('--scale', help="Key such as A:min (default: chromatic)")
+    args = parser.parse_args()
+
+    if args.input:
+        audio, _ = librosa.load(args.input, sr=args.sr, mono=True)
+    else:
+        audio, _ = sung_sweep(duration=20.0, sr=args.sr)
+
+    print(f"input: {args.input or 'synthetic sung sweep'} ({len(audio) / args.sr:.1f} s)")
+    print(f"{'block':>6} {'latency [ms]':>13} {'deadline [ms]':>14} {'mean [ms]':>10} {'p99 [ms]':>9} "
+          f"{'max [ms]':>9} {'missed':>8}")
+    for block_size in args.block_size:
+        processor = RealtimeVocalProcessor(sr=args.sr, block_size=block_size, scale=args.scale)
+        n_blocks = -(-len(audio) // block_size)
+        padded = np.zeros(n_blocks * block_size, dtype=np.float32)
+        padded[:len(audio)] = audio
+
+        output = np.zeros((2, padded.size), dtype=np.float32)
+        times = np.empty(n_blocks)
+        for i in range(n_blocks):
+            block = padded[i * block_size:(i + 1) * block_size]
+            start = time.perf_counter()
+            output[:, i * block_size:(i + 1) * block_size] = processor.process(block)
+            times[i] = time.perf_counter() - start
+
+        deadline = block_size / args.sr
+        missed = np.mean(times > deadline)
+        print(f"{block_size:>6} {processor.latency_seconds * 1000:>13.1f} {deadline * 1000:>14.2f} "
+              f"{times.mean() * 1000:>10.3f} {np.percentile(times, 99) * 1000:>9.3f} {times.max() * 1000:>9.3f} "
+              f"{missed:>8.1%}")
+
+        if args.output:
+            output_path = Path(args.output)
+            if len(args.block_size) > 1:
+                output_path = output_path.with_name(f'{output_path.stem}_{block_size}{output_path.suffix}')
+            sf.write(str(output_path), output[:, :len(audio)].T, args.sr)
+
+
+if __name__ == '__main__':
+    main()
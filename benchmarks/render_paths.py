@@ -0,0 +1,85 @@
+"""
+Compare the two-encode render path (standardize_video_dimensions + add_audio_to_video) with render_video.
+
+Reports encode time and generation loss (PSNR/SSIM against a lossless render of
+the same scale/crop and fades). The logo is left out so both outputs are
+compared against the same reference.
+
+Run from the repository root:
+    python -m benchmarks.render_paths --video input_video.mp4 --audio final_mix.wav
+"""
+import argparse
+import re
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from video_audio_utils import (
+    add_audio_to_video,
+    extract_audio_from_video,
+    probe_video,
+    render_video,
+    scale_crop_filter,
+    standardize_video_dimensions,
+)
+
+
+def lossless_reference(video_file, output_file, fade_duration, target_width=720, target_height=1280):
+    width, height, duration = probe_video(video_file)
+    video_filter = (
+        f'{scale_crop_filter(width, height, target_width, target_height)},'
+        f'fade=t=in:st=0:d={fade_duration},'
+        f'fade=t=out:st={duration - fade_duration}:d={fade_duration}'
+    )
+    subprocess.run(['ffmpeg', '-v', 'error', '-i', str(video_file), '-vf', video_filter,
+                    '-c:v', 'libx264', '-qp', '0', '-an', '-y', str(output_file)], check=True)
+
+
+def compare(distorted, reference, metric):
+    """Run ffmpeg's ssim or psnr filter and return the overall score."""
+    result = subprocess.run(['ffmpeg', '-i', str(distorted), '-i', str(reference),
+                             '-lavfi', f'[0:v][1:v]{metric}', '-f', 'null', '-'],
+                            capture_output=True, text=True, check=True)
+    pattern = r'All:([\d.]+)' if metric == 'ssim' else r'average:([\d.]+|inf)'
+    return float(re.findall(pattern, result.stderr)[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the render paths")
+    parser.add_argument('--video', required=True, help="Source video")
+    parser.add_argument('--audio', help="Audio to mux (default: the video's own audio)")
+    parser.add_argument('--fade-duration', type=float, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_dir = Path(work_dir)
+        audio_file = args.audio
+        if audio_file is None:
+            audio_file = work_dir / 'audio.wav'
+            extract_audio_from_video(args.video, audio_file)
+
+        suffix = Path(args.video).suffix
+        start = time.perf_counter()
+        standardized = work_dir / f'standardized{suffix}'
+        standardize_video_dimensions(args.video, standardized)
+        two_pass = work_dir / f'two_pass{suffix}'
+        add_audio_to_video(standardized, audio_file, two_pass, fade_duration=args.fade_duration)
+        two_pass_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        single_pass = work_dir / f'single_pass{suffix}'
+        render_video(args.video, audio_file, single_pass, fade_duration=args.fade_duration)
+        single_pass_time = time.perf_counter() - start
+
+        reference = work_dir / 'reference.mkv'
+        lossless_reference(args.video, reference, args.fade_duration)
+
+        print(f"{'path':<12} {'time [s]':>9} {'PSNR [dB]':>10} {'SSIM':>8}")
+        for name, output, elapsed in (('two-pass', two_pass, two_pass_time),
+                                      ('single-pass', single_pass, single_pass_time)):
+            print(f"{name:<12} {elapsed:>9.2f} {compare(output, reference, 'psnr'):>10.2f} "
+                  f"{compare(output, reference, 'ssim'):>8.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Report encode speed (frames per second) and output size for each render profile on a reference clip.
+
+Run from the repository root:
+    python -m benchmarks.render_profiles --video reference.mp4 --threads 4
+"""
+import argparse
+import json
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from video_audio_utils import RENDER_PROFILES, extract_audio_from_video, get_render_profile, render_video
+
+
+def count_frames(video_file):
+    output = subprocess.check_output([
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0', '-count_packets',
+        '-show_entries', 'stream=nb_read_packets', '-of', 'json', str(video_file)
+    ])
+    return int(json.loads(output)['streams'][0]['nb_read_packets'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark render profiles")
+    parser.add_argument('--video', required=True, help="Reference clip")
+    parser.add_argument('--config', help="config.json with extra render_profiles")
+    parser.add_argument('--threads', type=int, help="Override the thread count of every profile")
+    args = parser.parse_args()
+
+    profiles = None
+    if args.config:
+        with open(args.config, 'r') as config_file:
+            profiles = json.load(config_file).get('render_profiles')
+    names = sorted({**RENDER_PROFILES, **(profiles or {})})
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_dir = Path(work_dir)
+        audio_file = work_dir / 'audio.wav'
+        extract_audio_from_video(args.video, audio_file)
+
+        print(f"{'profile':<8} {'preset':<10} {'crf':>4} {'threads':>8} {'time [s]':>9} {'fps':>8} {'size [MB]':>10}")
+        for name in names:
+            settings = get_render_profile(name, profiles)
+            if args.threads is not None:
+                settings['threads'] = args.threads
+            output = work_dir / f'{name}{Path(args.video).suffix}'
+            start = time.perf_counter()
+            render_video(args.video, audio_file, output, render_profile=settings)
+            elapsed = time.perf_counter() - start
+            fps = count_frames(output) / elapsed
+            size_mb = output.stat().st_size / 2 ** 20
+            print(f"{name:<8} {settings['preset']:<10} {settings['crf']:>4} {settings['threads']:>8} "
+                  f"{elapsed:>9.2f} {fps:>8.1f} {size_mb:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare the lookup-table aclosest_pitch_from_scale against the original per-frame loop.
+
+Correctness is checked against a brute-force search over every note of the
+scale, since the original loop misses the octave wrap for keys not starting
+on C (e.g. in A minor, 11.8 semitones above C snaps down to B instead of up to C).
+
+Run from the repository root:
+    python -m benchmarks.scale_snapping --frames 30000 --scale A:min
+"""
+import argparse
+import time
+import numpy as np
+import librosa
+import scipy.signal as sig
+from auto_tune import aclosest_pitch_from_scale, closest_pitch_from_scale, scale_pitch_classes
+from benchmarks.signals import synthetic_f0
+
+
+def aclosest_pitch_from_scale_loop(f0, scale):
+    """Reference implementation: snap every frame separately with closest_pitch_from_scale."""
+    sanitized_pitch = np.zeros_like(f0)
+    for i in np.arange(f0.shape[0]):
+        sanitized_pitch[i] = closest_pitch_from_scale(f0[i], scale)
+    smoothed_sanitized_pitch = sig.medfilt(sanitized_pitch, kernel_size=3)
+    smoothed_sanitized_pitch[np.isnan(smoothed_sanitized_pitch)] = \
+        sanitized_pitch[np.isnan(smoothed_sanitized_pitch)]
+    return smoothed_sanitized_pitch
+
+
+def snap_brute_force(f0, scale):
+    """Nearest note of the scale for every frame, by comparing against all MIDI notes (lower note on ties)."""
+    pitch_classes = scale_pitch_classes(scale)
+    notes = np.array([note for note in range(128) if note % 12 in pitch_classes], dtype=float)
+    snapped = np.full_like(f0, np.nan)
+    voiced = ~np.isnan(f0)
+    midi_note = librosa.hz_to_midi(f0[voiced])
+    snapped[voiced] = librosa.midi_to_hz(notes[np.argmin(np.abs(notes[np.newaxis, :] - midi_note[:, np.newaxis]), axis=1)])
+    smoothed = sig.medfilt(snapped, kernel_size=3)
+    smoothed[np.isnan(smoothed)] = snapped[np.isnan(smoothed)]
+    return smoothed
+
+
+def time_call(function, *args, repeats=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scale snapping")
+    parser.add_argument('--frames', type=int, default=30000, help="Number of f0 frames")
+    parser.add_argument('--scale', default='A:min', help="Scale passed to librosa.key_to_degrees")
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    f0 = synthetic_f0(args.frames)
+    loop_time, _ = time_call(aclosest_pitch_from_scale_loop, f0, args.scale, repeats=args.repeats)
+    vector_time, actual = time_call(aclosest_pitch_from_scale, f0, args.scale, repeats=args.repeats)
+
+    if not np.allclose(snap_brute_force(f0, args.scale), actual, equal_nan=True):
+        raise AssertionError("Lookup-table scale snapping does not match the brute-force nearest note")
+
+    print(f"frames: {args.frames}, scale: {args.scale}")
+    print(f"loop:       {loop_time * 1000:.2f} ms")
+    print(f"table:      {vector_time * 1000:.2f} ms")
+    print(f"speedup:    {loop_time / vector_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
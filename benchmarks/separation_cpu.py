@@ -0,0 +1,82 @@
+"""
+Compare CPU inference options for Demucs: real-time factor and vocal-stem drift against the float32 path.
+
+Every option runs in a fresh process, because torch's inter-op thread pool
+can only be sized once per process. Drift is the SDR of each option's vocal
+stem against the vocals of the unmodified float32 run (higher is closer;
+identical output is reported as inf). With --reference-vocals the SDR
+against the isolated vocals is reported as well.
+
+Run from the repository root:
+    python -m benchmarks.separation_cpu --input clip.wav --profile balanced --threads 8 --interop-threads 2
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import soundfile as sf
+from benchmarks.separation_profiles import signal_to_distortion_ratio
+
+
+def options(threads, interop_threads):
+    tuned = {'threads': threads, 'interop_threads': interop_threads}
+    return [
+        ('float32', {}),
+        ('float32 + threads', tuned),
+        ('int8 dynamic', {**tuned, 'optimization': 'quantize'}),
+        ('torch.compile', {**tuned, 'optimization': 'compile'}),
+    ]
+
+
+def measure(input_file, profile, output_dir, results):
+    from source_separation import configure_cpu_threads, get_separation_profile, load_model, separate_sources
+
+    settings = get_separation_profile(profile)
+    configure_cpu_threads(settings['threads'], settings['interop_threads'])
+    start = time.perf_counter()
+    load_model(settings['model_name'], settings['optimization'])
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vocals_path, _ = separate_sources(input_file, output_dir, profile=profile)
+    results.put((load_time, time.perf_counter() - start, vocals_path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CPU inference options for source separation")
+    parser.add_argument('--input', required=True, help="Fixed test clip (mixture)")
+    parser.add_argument('--profile', default='balanced', help="Base separation profile")
+    parser.add_argument('--threads', type=int, default=multiprocessing.cpu_count(), help="Intra-op threads")
+    parser.add_argument('--interop-threads', type=int, default=1, help="Inter-op threads")
+    parser.add_argument('--reference-vocals', help="Isolated vocals of the clip")
+    args = parser.parse_args()
+
+    duration = sf.info(args.input).duration
+    reference = sf.read(args.reference_vocals, always_2d=True)[0] if args.reference_vocals else None
+    context = multiprocessing.get_context('spawn')
+
+    print(f"clip: {Path(args.input).name} ({duration:.1f} s), profile: {args.profile}")
+    print(f"{'option':<18} {'load [s]':>9} {'separate [s]':>13} {'RTF':>7} {'drift SDR [dB]':>15} {'vocal SDR [dB]':>15}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as work_dir:
+        for index, (name, settings) in enumerate(options(args.threads, args.interop_threads)):
+            results = context.Queue()
+            output_dir = str(Path(work_dir) / str(index))
+            process = context.Process(target=measure, args=(args.input, {'profile': args.profile, **settings},
+                                                             output_dir, results))
+            process.start()
+            load_time, elapsed, vocals_path = results.get()
+            process.join()
+
+            vocals, _ = sf.read(vocals_path, always_2d=True)
+            if baseline is None:
+                baseline = vocals
+            drift = float('inf') if np.array_equal(baseline, vocals) else signal_to_distortion_ratio(baseline, vocals)
+            sdr = signal_to_distortion_ratio(reference, vocals) if reference is not None else float('nan')
+            print(f"{name:<18} {load_time:>9.2f} {elapsed:>13.2f} {elapsed / duration:>7.3f} {drift:>15.2f} {sdr:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Measure peak RAM and stem size on disk for the full-stem and vocals-only separation paths.
+
+Every configuration runs in a fresh process so that peak RSS is not shared
+between runs. The model is loaded before the measurement starts, so the
+reported increase only covers the separation itself.
+
+Run from the repository root:
+    python -m benchmarks.separation_memory --input clip.wav --profile fast
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+CONFIGURATIONS = [
+    {'vocals_only': False, 'stem_format': 'float'},
+    {'vocals_only': True, 'stem_format': 'float'},
+    {'vocals_only': True, 'stem_format': 'pcm16'},
+    {'vocals_only': True, 'stem_format': 'flac'},
+    {'vocals_only': True, 'stem_format': 'pcm16', 'window_duration': 30.0},
+    {'vocals_only': False, 'stem_format': 'float', 'window_duration': 30.0},
+]
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(input_file, profile, separation_params, results):
+    from source_separation import get_separation_profile, load_model, separate_sources
+
+    load_model(get_separation_profile(profile)['model_name'])
+    baseline = peak_rss_mb()
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        paths = separate_sources(input_file, output_dir, profile=profile, **separation_params)
+        elapsed = time.perf_counter() - start
+        disk_mb = sum(os.path.getsize(path) for path in paths) / 2 ** 20
+    results.put((elapsed, peak_rss_mb() - baseline, disk_mb))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure separation memory and disk usage")
+    parser.add_argument('--input', required=True, help="Audio file to separate")
+    parser.add_argument('--profile', default='quality')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    print(f"clip: {Path(args.input).name}, profile: {args.profile}")
+    print(f"{'vocals_only':<12} {'format':<7} {'window [s]':>10} {'time [s]':>9} {'peak RSS increase [MB]':>23} {'stems on disk [MB]':>19}")
+    for separation_params in CONFIGURATIONS:
+        results = context.Queue()
+        process = context.Process(target=measure, args=(args.input, args.profile, separation_params, results))
+        process.start()
+        elapsed, rss_mb, disk_mb = results.get()
+        process.join()
+        window = separation_params.get('window_duration') or '-'
+        print(f"{str(separation_params['vocals_only']):<12} {separation_params['stem_format']:<7} {window:>10} "
+              f"{elapsed:>9.2f} {rss_mb:>23.1f} {disk_mb:>19.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark every separation profile on a fixed clip: wall time, real-time factor and vocal-stem SDR.
+
+Run from the repository root:
+    python -m benchmarks.separation_profiles --input clip.wav --reference-vocals clip_vocals.wav
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+import soundfile as sf
+from source_separation import SEPARATION_PROFILES, get_separation_profile, load_model, separate_sources
+
+
+def signal_to_distortion_ratio(reference, estimate):
+    """SDR in dB of estimate against reference, both shaped (samples, channels)."""
+    n = min(len(reference), len(estimate))
+    reference = reference[:n]
+    error = reference - estimate[:n]
+    return 10 * np.log10(np.sum(reference ** 2) / max(np.sum(error ** 2), 1e-12))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Demucs separation profiles")
+    parser.add_argument('--input', required=True, help="Fixed test clip (mixture)")
+    parser.add_argument('--reference-vocals', help="Isolated vocals of the clip, used for SDR")
+    parser.add_argument('--profiles', nargs='+', default=list(SEPARATION_PROFILES))
+    args = parser.parse_args()
+
+    duration = sf.info(args.input).duration
+    reference = None
+    if args.reference_vocals:
+        reference, _ = sf.read(args.reference_vocals, always_2d=True)
+
+    print(f"clip: {args.input} ({duration:.1f} s)")
+    print(f"{'profile':<10} {'load [s]':>9} {'separate [s]':>13} {'RTF':>7} {'vocal SDR [dB]':>15}")
+    for profile in args.profiles:
+        start = time.perf_counter()
+        load_model(get_separation_profile(profile)['model_name'])
+        load_time = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            start = time.perf_counter()
+            vocals_path, _ = separate_sources(args.input, output_dir, profile=profile)
+            elapsed = time.perf_counter() - start
+            sdr = float('nan')
+            if reference is not None:
+                vocals, _ = sf.read(vocals_path, always_2d=True)
+                sdr = signal_to_distortion_ratio(reference, vocals)
+
+        print(f"{profile:<10} {load_time:>9.2f} {elapsed:>13.2f} {elapsed / duration:>7.3f} {sdr:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Synthetic test signals for the benchmarks, generated offline so results are reproducible.
+"""
+import numpy as np
+import librosa
+
+
+def sung_sweep(duration=10.0, sr=44100, start_note='A2', end_note='A4', vibrato_rate=5.5,
+               vibrato_depth=0.3, n_harmonics=8, gap_every=2.0, gap_duration=0.25, seed=0):
+    """
+    Harmonic "sung" tone gliding between two notes with vibrato and short silent gaps.
+
+    Parameters:
+        duration (float): Length in seconds.
+        sr (int): Sample rate.
+        start_note (str): Note at the start of the glide.
+        end_note (str): Note at the end of the glide.
+        vibrato_rate (float): Vibrato frequency in Hz.
+        vibrato_depth (float): Vibrato depth in semitones.
+        n_harmonics (int): Number of harmonics with 1/k amplitude.
+        gap_every (float): Distance between silent gaps in seconds (0 disables gaps).
+        gap_duration (float): Length of each silent gap in seconds.
+        seed (int): Seed for the random phases of the harmonics.
+
+    Returns:
+        tuple: (audio, f0) where f0 is the per-sample fundamental in Hz.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sr)) / sr
+    midi = np.linspace(librosa.note_to_midi(start_note), librosa.note_to_midi(end_note), t.size)
+    midi = midi + vibrato_depth * np.sin(2 * np.pi * vibrato_rate * t)
+    f0 = librosa.midi_to_hz(midi)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+
+    audio = np.zeros_like(t)
+    for k in range(1, n_harmonics + 1):
+        audible = k * f0 < sr / 2
+        audio += audible * np.sin(k * phase + rng.uniform(0, 2 * np.pi)) / k
+
+    if gap_every > 0:
+        silent = (t % gap_every) > (gap_every - gap_duration)
+        audio[silent] = 0.0
+        f0 = f0.copy()
+        f0[silent] = np.nan
+
+    audio = 0.5 * audio / np.max(np.abs(audio))
+    return audio.astype(np.float32), f0
+
+
+def noise(duration=10.0, sr=44100, level=0.1, seed=0):
+    """White noise at the given RMS level."""
+    rng = np.random.default_rng(seed)
+    return (level * rng.standard_normal(int(duration * sr))).astype(np.float32)
+
+
+def mixture(duration=10.0, sr=44100, accompaniment_level=0.05, seed=0):
+    """
+    Stereo "song": a sung sweep over low-passed noise accompaniment.
+
+    Returns:
+        tuple: (mix, vocals, accompaniment), each float32 shaped (2, samples).
+    """
+    vocals, _ = sung_sweep(duration=duration, sr=sr, seed=seed)
+    accompaniment = noise(duration=duration, sr=sr, level=accompaniment_level, seed=seed + 1)
+    # Moving-average low-pass so the accompaniment does not mask the voice completely
+    accompaniment = np.convolve(accompaniment, np.full(8, 1 / 8), mode='same').astype(np.float32)
+    vocals = np.stack([vocals, vocals])
+    accompaniment = np.stack([accompaniment, np.roll(accompaniment, sr // 100)])
+    return vocals + accompaniment, vocals, accompaniment
+
+
+def synthetic_f0(n_frames, unvoiced_ratio=0.3, seed=0):
+    """Random pitch contour between C2 and C7 with unvoiced (NaN) frames."""
+    rng = np.random.default_rng(seed)
+    fmin = librosa.note_to_hz('C2')
+    fmax = librosa.note_to_hz('C7')
+    f0 = np.exp(rng.uniform(np.log(fmin), np.log(fmax), n_frames))
+    f0[rng.random(n_frames) < unvoiced_ratio] = np.nan
+    return f0
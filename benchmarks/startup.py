@@ -0,0 +1,50 @@
+"""
+Measure CLI startup time against eagerly importing every pipeline module, as main.py used to.
+
+Each measurement runs in a fresh interpreter, so nothing is shared between
+repeats except the operating system's file cache.
+
+Run from the repository root:
+    python -m benchmarks.startup --repeats 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# What `import main` loaded before the CLI deferred the heavy imports
+EAGER_IMPORTS = 'import auto_tune, sound_effects, source_separation, vocal_chain, mixing, video_audio_utils'
+
+COMMANDS = {
+    'eager imports (previous main.py)': [sys.executable, '-c', EAGER_IMPORTS],
+    'import main': [sys.executable, '-c', 'import main'],
+    'main.py --help': [sys.executable, 'main.py', '--help'],
+    'main.py mix --help': [sys.executable, 'main.py', 'mix', '--help'],
+    'import auto_tune': [sys.executable, '-c', 'import auto_tune'],
+    'import source_separation': [sys.executable, '-c', 'import source_separation'],
+}
+
+
+def time_command(command, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup time")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'command':<36} {'best [s]':>9} {'median [s]':>11}")
+    for name, command in COMMANDS.items():
+        times = time_command(command, args.repeats)
+        print(f"{name:<36} {min(times):>9.3f} {statistics.median(times):>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
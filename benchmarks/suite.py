@@ -0,0 +1,284 @@
+"""
+Reproducible benchmark suite for the audio pipeline.
+
+Every benchmark runs on synthetic signals generated from fixed seeds
+(benchmarks.signals), so two runs on the same machine are directly
+comparable. `run` writes the timings plus environment metadata to JSON;
+`compare` prints the change between two such files and exits with status 1
+when a benchmark got slower than the threshold.
+
+Run from the repository root:
+    python -m benchmarks.suite run --output baseline.json
+    python -m benchmarks.suite run --output candidate.json --separation-model stub
+    python -m benchmarks.suite compare baseline.json candidate.json --threshold 0.1
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+import numpy as np
+import soundfile as sf
+from benchmarks.signals import mixture, noise, sung_sweep, synthetic_f0
+
+SR = 44100
+DEFAULT_DURATIONS = [10.0, 60.0]
+QUICK_DURATIONS = [5.0]
+HOP_LENGTH = 512  # hop of autotune's pitch tracking, for realistic f0 array sizes
+
+
+def time_call(function, repeats=3, warmup=1):
+    """Run function warmup + repeats times and return the per-repeat wall times in seconds"""
+    for _ in range(warmup):
+        function()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Machine and library versions recorded next to the results"""
+    import librosa
+    import scipy
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'librosa': librosa.__version__,
+        'git_revision': git_revision(),
+    }
+    try:
+        import torch
+        info['torch'] = torch.__version__
+        info['torch_threads'] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return info
+
+
+def stub_separation_model():
+    """
+    Tiny stand-in for a Demucs model with the attributes apply_model needs.
+
+    Its "separation" is a fixed per-stem gain, so the benchmark measures the
+    surrounding work (loading, chunking, resampling, writing stems) without
+    downloading weights or running a network.
+    """
+    import torch
+
+    class StubSeparator(torch.nn.Module):
+        sources = ['drums', 'bass', 'other', 'vocals']
+        samplerate = SR
+        audio_channels = 2
+        segment = 7.8
+
+        def __init__(self):
+            super().__init__()
+            self.gains = torch.nn.Parameter(torch.tensor([0.25, 0.25, 0.25, 0.25]), requires_grad=False)
+
+        def forward(self, mix):
+            return mix.unsqueeze(1) * self.gains.view(1, -1, 1, 1)
+
+    return StubSeparator()
+
+
+def scale_snapping_benchmarks(durations):
+    from auto_tune import aclosest_pitch_from_scale
+    for duration in durations:
+        f0 = synthetic_f0(int(duration * SR / HOP_LENGTH))
+        yield f'aclosest_pitch_from_scale[{duration:g}s]', duration, partial(aclosest_pitch_from_scale, f0, 'A:min')
+
+
+def autotune_benchmarks(durations, pitch_tracker):
+    from auto_tune import aclosest_pitch_from_scale, autotune
+    correction_function = partial(aclosest_pitch_from_scale, scale='A:min')
+    for duration in durations:
+        audio, _ = sung_sweep(duration=duration, sr=SR)
+        yield (f'autotune_{pitch_tracker}[{duration:g}s]', duration,
+               partial(autotune, audio, SR, correction_function, pitch_tracker=pitch_tracker))
+        yield (f'autotune_{pitch_tracker}_selective[{duration:g}s]', duration,
+               partial(autotune, audio, SR, correction_function, pitch_tracker=pitch_tracker, selective=True))
+
+
+def plot_benchmarks(durations, work_dir):
+    import librosa
+    from auto_tune import HOP_LENGTH as AUTOTUNE_HOP, aclosest_pitch_from_scale
+    from plotting import pitch_plot_data, render_pitch_plot
+    fmin, fmax = librosa.note_to_hz('C2'), librosa.note_to_hz('C7')
+    for duration in durations:
+        audio, f0 = sung_sweep(duration=duration, sr=SR)
+        f0 = f0[::AUTOTUNE_HOP]
+        corrected_f0 = aclosest_pitch_from_scale(f0, 'A:min')
+        yield (f'pitch_plot_data[{duration:g}s]', duration,
+               partial(pitch_plot_data, audio, SR, f0, corrected_f0, AUTOTUNE_HOP, fmin, fmax))
+        data = pitch_plot_data(audio, SR, f0, corrected_f0, AUTOTUNE_HOP, fmin, fmax)
+        yield (f'render_pitch_plot[{duration:g}s]', duration,
+               partial(render_pitch_plot, work_dir / 'pitch_correction.png', data))
+
+
+def effect_benchmarks(durations, work_dir):
+    from sound_effects import apply_compression, apply_delay, apply_reverb
+    for duration in durations:
+        audio, _ = sung_sweep(duration=duration, sr=SR)
+        input_file = work_dir / f'vocals_{duration:g}.wav'
+        sf.write(str(input_file), audio + noise(duration, SR, level=0.01), SR)
+        output_file = str(work_dir / 'effect_output.wav')
+        for name, effect in [('apply_compression', apply_compression), ('apply_reverb', apply_reverb),
+                             ('apply_delay', apply_delay)]:
+            yield f'{name}[{duration:g}s]', duration, partial(effect, str(input_file), output_file)
+
+
+def separation_benchmarks(durations, work_dir, separation_model):
+    from source_separation import register_model, separate_sources
+    if separation_model == 'stub':
+        register_model('stub', stub_separation_model())
+        profile = {'profile': 'fast', 'model_name': 'stub'}
+    else:
+        profile = separation_model
+
+    for duration in durations:
+        mix, _, _ = mixture(duration=duration, sr=SR)
+        input_file = work_dir / f'mixture_{duration:g}.wav'
+        sf.write(str(input_file), mix.T, SR)
+        output_dir = work_dir / 'stems'
+
+        def separate(input_file=input_file):
+            # separate_sources skips existing stems, so start from an empty directory every time
+            for stem in output_dir.glob('*'):
+                stem.unlink()
+            separate_sources(str(input_file), str(output_dir), profile=profile)
+
+        yield f'separate_sources_{separation_model}[{duration:g}s]', duration, separate
+
+
+def mixing_benchmarks(durations):
+    from mixing import mix_with_ducking
+    for duration in durations:
+        _, vocals, accompaniment = mixture(duration=duration, sr=SR)
+        music = np.stack([noise(duration, SR, level=0.1, seed=2)] * 2)
+        yield (f'mix_with_ducking[{duration:g}s]', duration,
+               partial(mix_with_ducking, vocals, accompaniment, music, SR))
+
+
+BENCHMARK_GROUPS = ['scale', 'autotune', 'plot', 'effects', 'separation', 'mixing']
+
+
+def run(args):
+    durations = args.durations or (QUICK_DURATIONS if args.quick else DEFAULT_DURATIONS)
+    groups = args.only or BENCHMARK_GROUPS
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        work_dir = Path(work_dir)
+        benchmarks = {
+            'scale': lambda: scale_snapping_benchmarks(durations),
+            'autotune': lambda: autotune_benchmarks(durations, args.pitch_tracker),
+            'plot': lambda: plot_benchmarks(durations, work_dir),
+            'effects': lambda: effect_benchmarks(durations, work_dir),
+            'separation': lambda: separation_benchmarks(durations, work_dir, args.separation_model),
+            'mixing': lambda: mixing_benchmarks(durations),
+        }
+        for group in groups:
+            for name, audio_duration, function in benchmarks[group]():
+                times = time_call(function, repeats=args.repeats, warmup=args.warmup)
+                results[name] = {
+                    'group': group,
+                    'audio_duration_s': audio_duration,
+                    'repeats': len(times),
+                    'best_s': min(times),
+                    'median_s': statistics.median(times),
+                    'rtf': min(times) / audio_duration,
+                }
+                print(f"{name:<42} best {min(times):>9.4f} s  median {statistics.median(times):>9.4f} s  "
+                      f"RTF {min(times) / audio_duration:.4f}")
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment(),
+        'settings': {'durations': durations, 'repeats': args.repeats, 'warmup': args.warmup,
+                     'pitch_tracker': args.pitch_tracker, 'separation_model': args.separation_model},
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def compare(args):
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    with open(args.candidate, 'r') as f:
+        candidate = json.load(f)
+
+    for key in ('python', 'platform', 'numpy', 'librosa', 'torch'):
+        before, after = baseline['environment'].get(key), candidate['environment'].get(key)
+        if before != after:
+            print(f"warning: {key} differs ({before} -> {after}), timings may not be comparable")
+
+    regressions = []
+    print(f"{'benchmark':<42} {'baseline [s]':>13} {'candidate [s]':>14} {'change':>8}")
+    for name in sorted(set(baseline['results']) | set(candidate['results'])):
+        before = baseline['results'].get(name, {}).get(args.metric)
+        after = candidate['results'].get(name, {}).get(args.metric)
+        if before is None or after is None:
+            print(f"{name:<42} {before if before is not None else '-':>13} "
+                  f"{after if after is not None else '-':>14} {'n/a':>8}")
+            continue
+        change = after / before - 1
+        flag = ''
+        if change > args.threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<42} {before:>13.4f} {after:>14.4f} {change:>+8.1%}{flag}")
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than the {args.threshold:.0%} threshold")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible benchmark suite for the audio pipeline")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Run the benchmarks and write the results as JSON")
+    run_parser.add_argument('--output', default='benchmark_results.json')
+    run_parser.add_argument('--durations', type=float, nargs='+', help="Signal lengths in seconds")
+    run_parser.add_argument('--quick', action='store_true', help=f"Only run {QUICK_DURATIONS} second signals")
+    run_parser.add_argument('--only', nargs='+', choices=BENCHMARK_GROUPS, help="Benchmark groups to run")
+    run_parser.add_argument('--repeats', type=int, default=3)
+    run_parser.add_argument('--warmup', type=int, default=1)
+    run_parser.add_argument('--pitch-tracker', default='pyin', help="Pitch tracker used by autotune")
+    run_parser.add_argument('--separation-model', default='stub',
+                            help="'stub' for the tiny stand-in model, or a separation profile name")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = subparsers.add_parser('compare', help="Compare two result files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--metric', default='best_s', choices=['best_s', 'median_s', 'rtf'])
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help="Relative slowdown reported as a regression (0.1 = 10%%)")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import contextvars
+import cProfile
+import csv
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+RSS_SAMPLE_INTERVAL = 0.05  # seconds
+
+_current_profiler = contextvars.ContextVar('current_profiler', default=None)
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (the peak so far where /proc is not available)"""
+    try:
+        with open('/proc/self/statm', 'r') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def stage(name):
+    """
+    Instrument a block as a stage of the run active in this thread, if any.
+
+    Library code (auto_tune, vocal_chain, ...) wraps its sub-stages with this so
+    they show up nested in the report without passing a profiler around; with no
+    active RunProfiler it does nothing.
+    """
+    profiler = _current_profiler.get()
+    return profiler.stage(name) if profiler is not None else nullcontext()
+
+
+class RunProfiler:
+    """
+    Per-run instrumentation: wall time, thread CPU time and peak RSS of every stage, plus optional cProfile dumps.
+
+    Activate it for the current thread with `with profiler:`; stages opened
+    with profiler.stage() or instrumentation.stage() are then recorded, nested
+    stages under a 'parent/child' name. write_report() saves the records as
+    JSON and CSV together with the audio duration and each stage's real-time
+    factor. RSS is process-wide, so concurrent jobs in one process see each
+    other's memory.
+
+    Parameters:
+        run_name (str): Name of the run, used for the report files.
+        report_dir (str): Directory for reports and cProfile dumps.
+        cprofile (bool): Dump a cProfile .prof file for every top-level stage.
+        audio_duration (float): Duration of the processed audio in seconds, for real-time factors.
+    """
+
+    def __init__(self, run_name, report_dir='reports', cprofile=False, audio_duration=None):
+        self.run_name = run_name
+        self.report_dir = Path(report_dir)
+        self.cprofile = cprofile
+        self.audio_duration = audio_duration
+        self.records = []
+        self._stack = []
+        self._active = []
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._stop_sampler = threading.Event()
+        self._token = None
+        self._started = None
+
+    def __enter__(self):
+        self._token = _current_profiler.set(self)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _current_profiler.reset(self._token)
+        self._stop_sampler.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    @contextmanager
+    def stage(self, name):
+        """Record the wall time, thread CPU time and peak RSS of the wrapped block"""
+        self._ensure_sampler()
+        full_name = '/'.join([*self._stack, name])
+        record = {'stage': full_name, 'rss_start_mb': current_rss_mb()}
+        record['peak_rss_mb'] = record['rss_start_mb']
+        profile = cProfile.Profile() if self.cprofile and not self._stack else None
+
+        self._stack.append(name)
+        with self._lock:
+            self._active.append(record)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+            record['wall_s'] = time.perf_counter() - wall_start
+            record['thread_cpu_s'] = time.thread_time() - cpu_start
+            self._stack.pop()
+            with self._lock:
+                self._active.remove(record)
+                record['peak_rss_mb'] = max(record['peak_rss_mb'], current_rss_mb())
+                if self.audio_duration:
+                    record['rtf'] = record['wall_s'] / self.audio_duration
+                self.records.append(record)
+            if profile is not None:
+                self.report_dir.mkdir(parents=True, exist_ok=True)
+                profile.dump_stats(str(self.report_dir / f'{self.run_name}_{name}.prof'))
+
+    def write_report(self):
+        """Write <run_name>.json and <run_name>.csv to report_dir and return the JSON path"""
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        total = time.perf_counter() - self._started if self._started is not None else None
+        report = {
+            'run': self.run_name,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'audio_duration_s': self.audio_duration,
+            'total_wall_s': total,
+            'total_rtf': total / self.audio_duration if total and self.audio_duration else None,
+            'stages': self.records,
+        }
+        json_path = self.report_dir / f'{self.run_name}.json'
+        with open(json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        columns = ['stage', 'wall_s', 'thread_cpu_s', 'rtf', 'rss_start_mb', 'peak_rss_mb']
+        with open(self.report_dir / f'{self.run_name}.csv', 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self.records)
+        logging.info(f"Profiling report written to {json_path}")
+        return json_path
+
+    def _ensure_sampler(self):
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_rss, name='rss-sampler', daemon=True)
+            self._sampler.start()
+
+    def _sample_rss(self):
+        while not self._stop_sampler.wait(RSS_SAMPLE_INTERVAL):
+            rss = current_rss_mb()
+            with self._lock:
+                for record in self._active:
+                    record['peak_rss_mb'] = max(record['peak_rss_mb'], rss)
@@ -1,178 +1,569 @@
 import argparse
 from pathlib import Path
 from functools import partial
-import librosa
-import soundfile as sf
+import hashlib
 import subprocess
 import logging
 import json
-from auto_tune import autotune, closest_pitch, aclosest_pitch_from_scale
-from sound_effects import apply_reverb, apply_delay, apply_compression
-from source_separation import separate_sources
+import time
+from contextlib import nullcontext
+# Only lightweight modules are imported here; auto_tune, sound_effects, vocal_chain, mixing and
+# source_separation pull in librosa, matplotlib, pedalboard and torch, so they are imported by the
+# stages that need them. Cache hits and subcommands that skip those stages never load them.
+from stage_cache import StageCache
+from scheduler import StageScheduler
+import instrumentation
+from instrumentation import RunProfiler
 from video_audio_utils import (
     extract_audio_from_video, 
+    load_audio_from_video,
     add_audio_to_video, 
     mix_audio_with_ducking,
-    standardize_video_dimensions
+    standardize_video_dimensions,
+    render_video,
+    get_render_profile,
+    probe_media,
+    set_probe_cache_dir
 )
 
+MODULE_DIR = Path(__file__).resolve().parent
+
+def module_source(name):
+    """Source file of a pipeline module, for stage cache keys, without importing the module"""
+    return MODULE_DIR / f'{name}.py'
+
 def setup_logging():
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def main(video_file, plot=False, correction_method='scale', scale='C:maj', spread_factor=1.2, 
+def process_vocals_streaming(vocals_path, output_path, correction_function, compression_params=None,
+                             reverb_params=None, delay_params=None, streaming_params=None,
+                             pitch_tracking_params=None):
+    """
+    File-based vocal chain for streaming mode: autotune_stream reads and writes files block by block,
+    so every effect runs from and to a 16-bit WAV next to output_path.
+    """
+    from auto_tune import autotune_stream
+    from sound_effects import apply_reverb, apply_delay, apply_compression
+
+    stem = Path(output_path).parent / Path(vocals_path).stem
+    compressed_path = f'{stem}_compressed.wav'
+    corrected_path = f'{stem}_compressed_pitch_corrected.wav'
+    reverb_path = f'{stem}_compressed_pitch_corrected_reverb.wav'
+
+    apply_compression(vocals_path, compressed_path, **(compression_params or {}))
+    autotune_stream(compressed_path, corrected_path, correction_function,
+                    **(streaming_params or {}), **(pitch_tracking_params or {}))
+    apply_reverb(corrected_path, reverb_path, **(reverb_params or {}))
+    apply_delay(reverb_path, output_path, **(delay_params or {}))
+
+def correction_function_for(correction_method='scale', scale='C:maj', note_mask=None):
+    """Pitch correction function for a correction method: 'closest' (chromatic) or 'scale'"""
+    from auto_tune import closest_pitch, aclosest_pitch_from_scale
+    if correction_method == 'closest':
+        return closest_pitch
+    return partial(aclosest_pitch_from_scale, scale=scale, note_mask=note_mask)
+
+def analysis_params(compression_params=None, pitch_tracking_params=None):
+    """Settings a pitch analysis depends on: the compression before it and the tracker and its range"""
+    tracking = {key: value for key, value in (pitch_tracking_params or {}).items()
+                if key in ('pitch_tracker', 'fmin', 'fmax')}
+    return {'compression': compression_params, **tracking}
+
+def analysis_key(vocals_path, compression_params=None, pitch_tracking_params=None):
+    """Hash of a vocal stem's content and its analysis_params, naming reusable pitch analysis artifacts"""
+    digest = hashlib.sha256()
+    with open(vocals_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    digest.update(json.dumps(analysis_params(compression_params, pitch_tracking_params), sort_keys=True,
+                             default=str).encode())
+    return digest.hexdigest()
+
+def analyze_vocals(vocals_path, analysis_path, compression_params=None, pitch_tracking_params=None):
+    """Run pitch analysis on a vocal stem once and save it as a .npz artifact for process_vocals and sweep_vocals"""
+    import librosa
+    from auto_tune import save_pitch_analysis
+    from vocal_chain import VocalChain
+    logging.info(f"Analyzing the pitch of {vocals_path}")
+    audio, sr = librosa.load(vocals_path, sr=44100, mono=False)
+    chain = VocalChain(None, compression_params, pitch_tracking_params=pitch_tracking_params)
+    save_pitch_analysis(analysis_path, chain.analyze(audio, sr))
+
+def process_vocals(vocals_path, output_path, correction_function, compression_params=None, reverb_params=None,
+                   delay_params=None, pitch_tracking_params=None, streaming=False, streaming_params=None,
+                   plot=False, debug_dir=None, analysis_path=None, plot_path='pitch_correction.png'):
+    """
+    Compression, autotune, reverb and delay on a vocal stem, in memory or (streaming) block by block.
+
+    analysis_path is an optional artifact from analyze_vocals for the same stem and settings;
+    it replaces pitch tracking in the in-memory chain and is ignored in streaming mode.
+    Returns the Future of the pitch correction plot with plot=True (None in streaming mode).
+    """
+    if streaming:
+        logging.info("Processing vocals with streaming autotune")
+        if plot:
+            logging.warning("Pitch correction plot is not available in streaming mode")
+        process_vocals_streaming(str(vocals_path), str(output_path), correction_function,
+                                 compression_params, reverb_params, delay_params,
+                                 streaming_params, pitch_tracking_params)
+        return
+
+    import librosa
+    import soundfile as sf
+    from auto_tune import load_pitch_analysis
+    from vocal_chain import VocalChain
+    logging.info("Processing vocals: compression, autotune, reverb, delay")
+    audio, sr = librosa.load(vocals_path, sr=44100, mono=False)
+    chain = VocalChain(correction_function, compression_params, reverb_params, delay_params,
+                       pitch_tracking_params, plot=plot, plot_path=plot_path)
+    analysis = load_pitch_analysis(analysis_path) if analysis_path else None
+    processed = chain(audio, sr, debug_dir=debug_dir, debug_stem=Path(vocals_path).stem, analysis=analysis)
+    sf.write(str(output_path), processed.T, sr, subtype='PCM_16')
+    return chain.plot_future
+
+def sweep_vocals(vocals_path, output_dir, corrections, compression_params=None, reverb_params=None,
+                 delay_params=None, pitch_tracking_params=None, analysis_path=None, note_mask=None):
+    """
+    Render the vocal chain once per correction setting from a single pitch analysis.
+
+    Parameters:
+        vocals_path (str): Vocal stem to process.
+        output_dir (str): Directory for <stem>_<correction>.wav outputs.
+        corrections (list): 'closest' for chromatic correction, or scale keys such as 'A:min'.
+        analysis_path (str): Existing analyze_vocals artifact. By default it is saved in output_dir under a
+            name that includes analysis_key, and reused only for the same stem content and settings.
+        note_mask (list): Pitch-class mask applied to every scale, see auto_tune.pitch_table.
+
+    Returns:
+        dict: Output path per correction.
+    """
+    import librosa
+    import soundfile as sf
+    from auto_tune import load_pitch_analysis
+    from vocal_chain import VocalChain
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = Path(vocals_path).stem
+    if analysis_path is None:
+        key = analysis_key(vocals_path, compression_params, pitch_tracking_params)
+        analysis_path = output_dir / f'{stem}_pitch_analysis_{key[:12]}.npz'
+    if not Path(analysis_path).exists():
+        analyze_vocals(vocals_path, analysis_path, compression_params, pitch_tracking_params)
+    analysis = load_pitch_analysis(analysis_path)
+
+    audio, sr = librosa.load(vocals_path, sr=44100, mono=False)
+    outputs = {}
+    for correction in corrections:
+        correction_method = 'closest' if correction == 'closest' else 'scale'
+        chain = VocalChain(correction_function_for(correction_method, correction, note_mask), compression_params,
+                           reverb_params, delay_params, pitch_tracking_params)
+        output_path = output_dir / f"{stem}_{correction.replace(':', '_')}.wav"
+        logging.info(f"Rendering vocals with {correction} correction")
+        sf.write(str(output_path), chain(audio, sr, analysis=analysis).T, sr, subtype='PCM_16')
+        outputs[correction] = str(output_path)
+    return outputs
+
+def remix(vocals_path, other_path, output_path, background_music_path=None, mixer='numpy', vocals_volume=1.0,
+          other_volume=0.9, music_volume=0.8, ducking_ratio=2.5, ducking_threshold=0.015):
+    """Mix the processed vocals, the other instruments and the optional background music with ducking"""
+    if mixer == 'numpy':
+        from mixing import mix_files
+        mix_files(vocals_path, other_path, output_path, background_music_path,
+                  vocals_volume=vocals_volume, other_volume=other_volume, music_volume=music_volume,
+                  ducking_ratio=ducking_ratio, ducking_threshold=ducking_threshold)
+        return
+
+    try:
+        if background_music_path:
+            mix_audio_with_ducking(
+                str(vocals_path),
+                str(other_path),
+                str(background_music_path),
+                str(output_path),
+                vocals_volume=vocals_volume,
+                other_volume=other_volume,
+                music_volume=music_volume,
+                ducking_ratio=ducking_ratio,
+                ducking_threshold=ducking_threshold
+            )
+        else:
+            # Original mixing without background music
+            subprocess.run([
+                'ffmpeg',
+                '-i', str(vocals_path),
+                '-i', str(other_path),
+                '-filter_complex',
+                f'[0:a]volume={vocals_volume}[v1];[1:a]volume={other_volume}[v2];[v1][v2]amix=inputs=2:duration=longest',
+                '-y',
+                str(output_path)
+            ], check=True)
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Error during remixing: {str(e)}")
+        raise
+
+def stem_paths(stem_dir):
+    """vocals_output and other_output stems already written to stem_dir by separate_sources"""
+    return tuple(str(next(Path(stem_dir).glob(f'{name}_output.*'))) for name in ('vocals', 'other'))
+
+def main(video_file, plot=False, correction_method='scale', scale='C:maj', note_mask=None, spread_factor=1.2, 
          background_music_path=None, vocals_volume=1.0, music_volume=0.8, other_volume=0.9,
          ducking_ratio=2.5, ducking_threshold=0.015, compression_params=None, 
-         reverb_params=None, delay_params=None):
+         reverb_params=None, delay_params=None, streaming=False, streaming_params=None,
+         pitch_tracking_params=None, separation_profile='quality', separation_params=None,
+         debug=False, cache_params=None, single_pass_render=True, render_profile='final', render_profiles=None,
+         in_memory_extraction=True, mixer='numpy', profiling_params=None,
+         cache=None, scheduler=None, job_id=None, separation_worker=None):
     setup_logging()
+    # Key for the scheduler's timings; batch runs pass a unique id, as one video may be queued with different settings
+    job = job_id or str(video_file)
+    scheduler = scheduler or StageScheduler()
     
     video_filepath = Path(video_file)
     cache_dir = video_filepath.parent / (video_filepath.stem + '_output')
-    cache_dir.mkdir(exist_ok=True)
-    
-    # Standardize video dimensions to 720x1280 if needed
-    standardized_video = cache_dir / (video_filepath.stem + '_standardized' + video_filepath.suffix)
-    if not standardized_video.exists():
-        logging.info("Standardizing video dimensions to 720x1280")
-        standardize_video_dimensions(video_filepath, standardized_video, target_width=720, target_height=1280)
-        video_filepath = standardized_video
-        logging.info(f"Video dimensions standardized: {standardized_video}")
-    else:
-        video_filepath = standardized_video
-        logging.info(f"Standardized video already exists: {standardized_video}")
-
-    audio_filepath = cache_dir / (video_filepath.stem + '_audio.wav')
-
-    if not audio_filepath.exists():
-        logging.info(f"Extracting audio from video {video_filepath}")
-        extract_audio_from_video(video_filepath, audio_filepath)
-        logging.info(f"Audio extracted to {audio_filepath}")
-    else:
-        logging.info(f"Audio file already exists: {audio_filepath}")
-
-    logging.info(f"Starting source separation for {audio_filepath}")
-    vocals_path, other_path = separate_sources(str(audio_filepath), str(cache_dir))
-    logging.info(f"Source separation completed. Vocals: {vocals_path}, Other: {other_path}")
+    if debug:
+        cache_dir.mkdir(exist_ok=True)
 
-    # Apply compression to vocals first
-    compressed_filepath = cache_dir / (Path(vocals_path).stem + '_compressed' + Path(vocals_path).suffix)
-    if not compressed_filepath.exists():
-        logging.info("Applying compression to vocals")
-        if compression_params:
-            apply_compression(str(vocals_path), str(compressed_filepath), **compression_params)
-        else:
-            apply_compression(str(vocals_path), str(compressed_filepath))
-        logging.info(f"Compression completed. Output file: {compressed_filepath}")
-    
-    # Process vocals with autotune after compression
-    y, sr = librosa.load(compressed_filepath, sr=None, mono=True)
-    if y.ndim > 1:
-        y = y[0, :]
-
-    correction_function = closest_pitch if correction_method == 'closest' else \
-        partial(aclosest_pitch_from_scale, scale=scale)
-
-    corrected_filepath = cache_dir / (Path(compressed_filepath).stem + '_pitch_corrected' + Path(compressed_filepath).suffix)
-    if not corrected_filepath.exists():
-        logging.info("Starting autotune")
-
-        #pitch_corrected_y = autotune(y, sr, correction_function, 2, min_note_duration=0, plot = plot)
-        pitch_corrected_y = autotune(y, sr, correction_function, plot = plot)
-
-        sf.write(str(corrected_filepath), pitch_corrected_y, sr)
-        logging.info(f"Autotune completed. Pitch corrected file: {corrected_filepath}")
-    else:
-        logging.info(f"Pitch corrected file already exists: {corrected_filepath}")
-
-    reverb_output_filepath = cache_dir / (Path(compressed_filepath).stem + '_pitch_corrected_reverb' + Path(compressed_filepath).suffix)
-    if not reverb_output_filepath.exists():
-        logging.info("Starting reverb application")
-        if reverb_params:
-            apply_reverb(str(corrected_filepath), str(reverb_output_filepath), **reverb_params)
+    # Stage outputs are keyed on input content, parameters and code, so changing
+    # a setting only reruns the stages downstream of it
+    owns_cache = cache is None
+    cache = cache or StageCache(**(cache_params or {}))
+    set_probe_cache_dir(cache.root)
+
+    profiler = None
+    if profiling_params and profiling_params.get('enabled', True):
+        run_name = f"{video_filepath.stem}_{time.strftime('%Y%m%d-%H%M%S')}"
+        profiler = RunProfiler(run_name, report_dir=profiling_params.get('report_dir', 'reports'),
+                               cprofile=profiling_params.get('cprofile', False),
+                               audio_duration=probe_media(video_filepath)['duration'])
+
+    with profiler or nullcontext():
+        render_settings = get_render_profile(render_profile, render_profiles)
+
+        if single_pass_render:
+            # Scaling and cropping happen in the final render; the audio is the same either way
+            source_video = video_filepath
         else:
-            apply_reverb(str(corrected_filepath), str(reverb_output_filepath))
-        logging.info(f"Reverb application completed. Reverb file: {reverb_output_filepath}")
-    
-    # Apply delay after reverb
-    delay_output_filepath = cache_dir / (Path(compressed_filepath).stem + '_pitch_corrected_reverb_delay' + Path(compressed_filepath).suffix)
-    if not delay_output_filepath.exists():
-        logging.info("Starting delay application")
-        if delay_params:
-            apply_delay(str(reverb_output_filepath), str(delay_output_filepath), **delay_params)
+            # Standardize video dimensions to 720x1280 if needed
+            with cache.stage('standardize', [video_filepath], {'width': 720, 'height': 1280, **render_settings},
+                             [module_source('video_audio_utils')]) as entry:
+                source_video = entry.path('standardized' + video_filepath.suffix)
+                if not entry.hit:
+                    logging.info("Standardizing video dimensions to 720x1280")
+                    with scheduler.stage(job, 'standardize'):
+                        standardize_video_dimensions(video_filepath, source_video, target_width=720, target_height=1280,
+                                                     render_profile=render_settings)
+                    logging.info(f"Video dimensions standardized: {source_video}")
+
+        separation_params = separation_params or {}
+        if in_memory_extraction:
+            # The separation stage decodes the audio straight from the video at 44.1 kHz stereo
+            separation_input = source_video
         else:
-            apply_delay(str(reverb_output_filepath), str(delay_output_filepath))
-        final_vocals_path = delay_output_filepath
-        logging.info(f"Delay application completed. Final vocals file: {delay_output_filepath}")
-    else:
-        final_vocals_path = delay_output_filepath
-        logging.info(f"Delay file already exists: {delay_output_filepath}")
-
-    # Remix all sources using ffmpeg with ducking
-    final_audio_path = cache_dir / (audio_filepath.stem + '_final_mix' + audio_filepath.suffix)
-    if not final_audio_path.exists():
-        logging.info("Starting remixing with ducking effect")
-        try:
-            if background_music_path:
-                mix_audio_with_ducking(
-                    str(final_vocals_path),
-                    str(other_path),
-                    str(background_music_path),
-                    str(final_audio_path),
-                    vocals_volume=vocals_volume,
-                    other_volume=other_volume,
-                    music_volume=music_volume,
-                    ducking_ratio=ducking_ratio,
-                    ducking_threshold=ducking_threshold
-                )
+            with cache.stage('extract', [source_video], {}, [module_source('video_audio_utils')]) as entry:
+                separation_input = entry.path('audio.wav')
+                if not entry.hit:
+                    logging.info(f"Extracting audio from video {source_video}")
+                    with scheduler.stage(job, 'extract'):
+                        extract_audio_from_video(source_video, separation_input)
+                    logging.info(f"Audio extracted to {separation_input}")
+
+        with cache.stage('separate', [separation_input],
+                         {'profile': separation_profile, 'in_memory_extraction': in_memory_extraction, **separation_params},
+                         [module_source('source_separation'), module_source('video_audio_utils')]) as entry:
+            if entry.hit:
+                vocals_path, other_path = stem_paths(entry.dir)
             else:
-                # Original mixing without background music
-                subprocess.run([
-                    'ffmpeg',
-                    '-i', str(final_vocals_path),
-                    '-i', str(other_path),
-                    '-filter_complex',
-                    f'[0:a]volume={vocals_volume}[v1];[1:a]volume={other_volume}[v2];[v1][v2]amix=inputs=2:duration=longest',
-                    '-y',
-                    str(final_audio_path)
-                ], check=True)
-            logging.info(f"Remixing completed. Final audio file: {final_audio_path}")
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Error during remixing: {str(e)}")
-            raise
-    else:
-        logging.info(f"Final audio file already exists: {final_audio_path}")
-
-    output_dir = Path('output')
-
-    # Add the final audio back to the video with fade effects and logo
-    final_video_path = output_dir / (video_filepath.stem + '_final' + video_filepath.suffix)
-    if not final_video_path.exists():
-        logging.info("Adding final audio back to video with effects")
+                logging.info(f"Starting source separation for {separation_input}")
+                from source_separation import separate_sources
+                with scheduler.stage(job, 'separate'):
+                    audio = None
+                    # Windowed separation streams the input from ffmpeg itself
+                    if in_memory_extraction and not separation_params.get('window_duration'):
+                        with instrumentation.stage('decode_audio'):
+                            audio = (load_audio_from_video(source_video, sr=44100, channels=2), 44100)
+                    if separation_worker is not None:
+                        # Batch runs share a worker that keeps the model loaded across videos
+                        vocals_path, other_path = separation_worker.submit(str(separation_input), str(entry.dir),
+                                                                           job_id=job, audio=audio,
+                                                                           **separation_params).result()
+                    else:
+                        vocals_path, other_path = separate_sources(str(separation_input), str(entry.dir),
+                                                                  profile=separation_profile, audio=audio,
+                                                                  **separation_params)
+                    del audio
+            logging.info(f"Source separation completed. Vocals: {vocals_path}, Other: {other_path}")
+
+        # Compression, autotune, reverb and delay, in that order
+        vocal_params = {
+            'correction_method': correction_method,
+            'scale': scale if correction_method != 'closest' else None,
+            'note_mask': note_mask if correction_method != 'closest' else None,
+            'compression': compression_params,
+            'reverb': reverb_params,
+            'delay': delay_params,
+            'pitch_tracking': pitch_tracking_params,
+            'streaming': streaming,
+            'streaming_params': streaming_params if streaming else None,
+        }
+        # Pitch analysis depends only on the stem, compression and tracker settings, so changing
+        # the scale or correction method reuses it instead of rerunning pYIN
+        analysis_path = None
+        analysis_entry_key = None
+        if not streaming:
+            with cache.stage('pitch_analysis', [vocals_path], analysis_params(compression_params, pitch_tracking_params),
+                             [module_source('auto_tune'), module_source('sound_effects'),
+                              module_source('vocal_chain')]) as entry:
+                analysis_path = entry.path('pitch_analysis.npz')
+                analysis_entry_key = entry.key
+                if not entry.hit:
+                    with scheduler.stage(job, 'pitch_analysis'):
+                        analyze_vocals(vocals_path, analysis_path, compression_params, pitch_tracking_params)
+
+        # Keyed on the analysis entry rather than the .npz bytes, which change with the zip timestamps
+        # whenever an identical analysis is recomputed
+        with cache.stage('vocals', [vocals_path], {**vocal_params, 'pitch_analysis': analysis_entry_key},
+                         [module_source('auto_tune'), module_source('sound_effects'), module_source('vocal_chain'),
+                          module_source('main')]) as entry:
+            final_vocals_path = entry.path('vocals_processed.wav')
+            # The plot is drawn in the background while the mix and render stages run. It is named after the
+            # stage key, so jobs rendering the same video with different settings do not overwrite each other's
+            plot_path = Path('output') / f'{video_filepath.stem}_{entry.key[:12]}_pitch_correction.png'
+            plot_future = None
+            if not entry.hit:
+                if plot:
+                    plot_path.parent.mkdir(exist_ok=True)
+                with scheduler.stage(job, 'vocals'):
+                    plot_future = process_vocals(vocals_path, final_vocals_path,
+                                                 correction_function_for(correction_method, scale, note_mask),
+                                                 compression_params, reverb_params, delay_params,
+                                                 pitch_tracking_params, streaming, streaming_params, plot=plot,
+                                                 debug_dir=cache_dir if debug else None,
+                                                 analysis_path=analysis_path, plot_path=plot_path)
+                logging.info(f"Vocal processing completed. Final vocals file: {final_vocals_path}")
+
+        # Remix all sources with ducking, in memory or with ffmpeg
+        mix_params = {
+            'mixer': mixer,
+            'vocals_volume': vocals_volume,
+            'other_volume': other_volume,
+            'music_volume': music_volume if background_music_path else None,
+            'ducking_ratio': ducking_ratio if background_music_path else None,
+            'ducking_threshold': ducking_threshold if background_music_path else None,
+        }
+        with cache.stage('mix', [final_vocals_path, other_path, background_music_path], mix_params,
+                         [module_source('video_audio_utils'), module_source('mixing'), module_source('main')]) as entry:
+            final_audio_path = entry.path('final_mix.wav')
+            if not entry.hit:
+                logging.info("Starting remixing with ducking effect")
+                with scheduler.stage(job, 'mix'):
+                    remix(final_vocals_path, other_path, final_audio_path, background_music_path, mixer=mixer,
+                          vocals_volume=vocals_volume, other_volume=other_volume, music_volume=music_volume,
+                          ducking_ratio=ducking_ratio, ducking_threshold=ducking_threshold)
+                    logging.info(f"Remixing completed. Final audio file: {final_audio_path}")
+
+        output_dir = Path('output')
+
+        # Add the final audio back to the video with fade effects and logo
         logo_path = Path('logo.jpg')
         logo_arg = str(logo_path) if logo_path.exists() else None
-        add_audio_to_video(video_filepath, final_audio_path, final_video_path, 
-                          fade_duration=3, logo_path=logo_arg)
+        render_params = {'fade_duration': 3, 'single_pass': single_pass_render, 'width': 720, 'height': 1280,
+                         **render_settings}
+        with cache.stage('render', [source_video, final_audio_path, logo_arg], render_params,
+                         [module_source('video_audio_utils')]) as entry:
+            rendered_video = entry.path('final' + video_filepath.suffix)
+            if not entry.hit:
+                logging.info("Adding final audio back to video with effects")
+                with scheduler.stage(job, 'render'):
+                    if single_pass_render:
+                        render_video(source_video, final_audio_path, rendered_video, target_width=720,
+                                     target_height=1280, fade_duration=3, logo_path=logo_arg,
+                                     render_profile=render_settings)
+                    else:
+                        add_audio_to_video(source_video, final_audio_path, rendered_video,
+                                          fade_duration=3, logo_path=logo_arg, render_profile=render_settings)
+
+        final_video_path = cache.export(rendered_video,
+                                        output_dir / (video_filepath.stem + '_standardized_final' + video_filepath.suffix))
         logging.info(f"Final video created: {final_video_path}")
-    else:
-        logging.info(f"Final video file already exists: {final_video_path}")
-
-# Load configuration from config.json
-with open('config.json', 'r') as config_file:
-    config = json.load(config_file)
-
-# Call the main function with values from the config file
-main(
-    video_file=config['video_file'],
-    plot=config.get('plot', False),
-    correction_method=config.get('correction_method', 'closest'),
-    scale=config.get('scale'),
-    spread_factor=config.get('spread_factor', 1.2),
-    background_music_path=config.get('background_music_path'),
-    vocals_volume=config.get('vocals_volume', 1.0),
-    music_volume=config.get('music_volume', 0.8),
-    other_volume=config.get('other_volume', 0.9),
-    ducking_ratio=config.get('ducking_ratio', 2.5),
-    ducking_threshold=config.get('ducking_threshold', 0.015),
-    compression_params=config.get('compression'),
-    reverb_params=config.get('reverb'),
-    delay_params=config.get('delay')
-)
\ No newline at end of file
+
+        # Only this job's plot: other jobs of a batch may still be plotting
+        if plot_future is not None:
+            from plotting import wait_for_plot
+            wait_for_plot(plot_future)
+
+        # A shared cache is evicted by its owner once all of its jobs are done
+        if owns_cache:
+            cache.evict()
+
+    if profiler is not None:
+        profiler.write_report()
+
+def main_kwargs_from_config(config):
+    """Map a config.json dictionary to the keyword arguments of main"""
+    return dict(
+        video_file=config.get('video_file'),
+        plot=config.get('plot', False),
+        correction_method=config.get('correction_method', 'closest'),
+        scale=config.get('scale'),
+        note_mask=config.get('note_mask'),
+        spread_factor=config.get('spread_factor', 1.2),
+        background_music_path=config.get('background_music_path'),
+        vocals_volume=config.get('vocals_volume', 1.0),
+        music_volume=config.get('music_volume', 0.8),
+        other_volume=config.get('other_volume', 0.9),
+        ducking_ratio=config.get('ducking_ratio', 2.5),
+        ducking_threshold=config.get('ducking_threshold', 0.015),
+        compression_params=config.get('compression'),
+        reverb_params=config.get('reverb'),
+        delay_params=config.get('delay'),
+        streaming=config.get('streaming', False),
+        streaming_params=config.get('streaming_params'),
+        pitch_tracking_params=config.get('pitch_tracking'),
+        separation_profile=config.get('separation_profile', 'quality'),
+        separation_params=config.get('separation'),
+        debug=config.get('debug', False),
+        cache_params=config.get('cache'),
+        single_pass_render=config.get('single_pass_render', True),
+        render_profile=config.get('render_profile', 'final'),
+        render_profiles=config.get('render_profiles'),
+        in_memory_extraction=config.get('in_memory_extraction', True),
+        mixer=config.get('mixer', 'numpy'),
+        profiling_params=config.get('profiling')
+    )
+
+def load_config(config_path):
+    """Read config.json; a missing file gives an empty config so subcommands can run on their defaults"""
+    if not Path(config_path).exists():
+        return {}
+    with open(config_path, 'r') as config_file:
+        return json.load(config_file)
+
+def run_command(args, config):
+    kwargs = main_kwargs_from_config(config)
+    if args.video_file:
+        kwargs['video_file'] = args.video_file
+    if not kwargs['video_file']:
+        raise SystemExit("No video file given on the command line or in the config")
+    main(**kwargs)
+
+def separate_command(args, config):
+    from source_separation import separate_sources
+    separation_params = dict(config.get('separation') or {})
+    if args.stem_format:
+        separation_params['stem_format'] = args.stem_format
+    if args.vocals_only:
+        separation_params['vocals_only'] = True
+    if args.window_duration:
+        separation_params['window_duration'] = args.window_duration
+    input_path = Path(args.input)
+    output_dir = args.output_dir or input_path.parent / (input_path.stem + '_stems')
+    # ffmpeg decodes audio and video files alike; windowed separation streams the input itself
+    audio = None
+    if not separation_params.get('window_duration'):
+        audio = (load_audio_from_video(input_path, sr=44100, channels=2), 44100)
+    vocals_path, other_path = separate_sources(str(input_path), str(output_dir),
+                                               profile=args.profile or config.get('separation_profile', 'quality'),
+                                               audio=audio, **separation_params)
+    logging.info(f"Source separation completed. Vocals: {vocals_path}, Other: {other_path}")
+
+def tune_command(args, config):
+    kwargs = main_kwargs_from_config(config)
+    correction_method = args.correction_method or kwargs['correction_method']
+    scale = args.scale or kwargs['scale']
+    plot_future = process_vocals(args.input, args.output,
+                                 correction_function_for(correction_method, scale, kwargs['note_mask']),
+                                 kwargs['compression_params'], kwargs['reverb_params'], kwargs['delay_params'],
+                                 kwargs['pitch_tracking_params'], kwargs['streaming'], kwargs['streaming_params'],
+                                 plot=args.plot or kwargs['plot'],
+                                 plot_path=Path(args.output).with_name(Path(args.output).stem + '_pitch_correction.png'))
+    if plot_future is not None:
+        from plotting import wait_for_plot
+        wait_for_plot(plot_future)
+    logging.info(f"Vocal processing completed. Final vocals file: {args.output}")
+
+def sweep_command(args, config):
+    kwargs = main_kwargs_from_config(config)
+    outputs = sweep_vocals(args.input, args.output_dir, args.corrections, kwargs['compression_params'],
+                           kwargs['reverb_params'], kwargs['delay_params'], kwargs['pitch_tracking_params'],
+                           analysis_path=args.analysis, note_mask=kwargs['note_mask'])
+    for correction, output_path in outputs.items():
+        logging.info(f"{correction}: {output_path}")
+
+def mix_command(args, config):
+    kwargs = main_kwargs_from_config(config)
+    remix(args.vocals, args.other, args.output, args.music or kwargs['background_music_path'],
+          mixer=args.mixer or kwargs['mixer'], vocals_volume=kwargs['vocals_volume'],
+          other_volume=kwargs['other_volume'], music_volume=kwargs['music_volume'],
+          ducking_ratio=kwargs['ducking_ratio'], ducking_threshold=kwargs['ducking_threshold'])
+    logging.info(f"Remixing completed. Final audio file: {args.output}")
+
+def render_command(args, config):
+    render_settings = get_render_profile(args.render_profile or config.get('render_profile', 'final'),
+                                         config.get('render_profiles'))
+    logo_path = args.logo if args.logo is not None else ('logo.jpg' if Path('logo.jpg').exists() else None)
+    render_video(args.video, args.audio, args.output, target_width=720, target_height=1280, fade_duration=3,
+                 logo_path=logo_path or None, render_profile=render_settings)
+    logging.info(f"Final video created: {args.output}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Separate, pitch-correct, remix and render the vocals of a video")
+    parser.add_argument('--config', default='config.json', help="Configuration file (default: config.json)")
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help="Run the whole pipeline (the default command)")
+    run_parser.add_argument('video_file', nargs='?', help="Input video (default: video_file from the config)")
+    run_parser.set_defaults(handler=run_command)
+
+    separate_parser = subparsers.add_parser('separate', help="Split an audio or video file into vocals and other")
+    separate_parser.add_argument('input')
+    separate_parser.add_argument('--output-dir', help="Directory for the stems (default: <input>_stems)")
+    separate_parser.add_argument('--profile', help="Separation profile (default: separation_profile from the config)")
+    separate_parser.add_argument('--stem-format', help="Stem format: float, pcm16 or flac")
+    separate_parser.add_argument('--vocals-only', action='store_true')
+    separate_parser.add_argument('--window-duration', type=float,
+                                 help="Separate long inputs in windows of this many seconds, streaming the stems")
+    separate_parser.set_defaults(handler=separate_command)
+
+    tune_parser = subparsers.add_parser('tune', help="Run the vocal chain (compression, autotune, reverb, delay)")
+    tune_parser.add_argument('input')
+    tune_parser.add_argument('output')
+    tune_parser.add_argument('--correction-method', choices=['closest', 'scale'])
+    tune_parser.add_argument('--scale', help="Key such as A:min")
+    tune_parser.add_argument('--plot', action='store_true', help="Save the pitch correction plot")
+    tune_parser.set_defaults(handler=tune_command)
+
+    sweep_parser = subparsers.add_parser('sweep', help="Render a vocal stem in several keys from one pitch analysis")
+    sweep_parser.add_argument('input')
+    sweep_parser.add_argument('corrections', nargs='+', help="Scale keys such as A:min, or 'closest'")
+    sweep_parser.add_argument('--output-dir', default='sweep', help="Directory for the renders (default: sweep)")
+    sweep_parser.add_argument('--analysis', help="Existing pitch analysis .npz (default: computed once and saved)")
+    sweep_parser.set_defaults(handler=sweep_command)
+
+    mix_parser = subparsers.add_parser('mix', help="Mix processed vocals with the other stem and background music")
+    mix_parser.add_argument('vocals')
+    mix_parser.add_argument('other')
+    mix_parser.add_argument('output')
+    mix_parser.add_argument('--music', help="Background music (default: background_music_path from the config)")
+    mix_parser.add_argument('--mixer', choices=['numpy', 'ffmpeg'])
+    mix_parser.set_defaults(handler=mix_command)
+
+    render_parser = subparsers.add_parser('render', help="Render a video with new audio, fades and logo")
+    render_parser.add_argument('video')
+    render_parser.add_argument('audio')
+    render_parser.add_argument('output')
+    render_parser.add_argument('--render-profile', help="Render profile (default: render_profile from the config)")
+    render_parser.add_argument('--logo', help="Logo image, '' for none (default: logo.jpg if present)")
+    render_parser.set_defaults(handler=render_command)
+    return parser
+
+def cli(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        # Plain `python main.py` keeps running the pipeline from config.json
+        args = parser.parse_args(['--config', args.config, 'run'])
+    setup_logging()
+    args.handler(args, load_config(args.config))
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,133 @@
+import numpy as np
+import librosa
+import soundfile as sf
+from sound_effects import to_stereo
+
+# Gain is computed once per control block and interpolated back to the sample rate;
+# 64 samples is 1.5 ms at 44.1 kHz, far below the 10-300 ms attack/release times used here
+CONTROL_BLOCK = 64
+
+# Fixed settings of the ffmpeg graph in video_audio_utils.mix_audio_with_ducking
+GATE_THRESHOLD = 0.1
+GATE_RATIO = 2
+GATE_ATTACK_MS = 10
+GATE_RELEASE_MS = 100
+GATE_RANGE = 0.06125  # agate's default maximum attenuation
+DUCKING_ATTACK_MS = 50
+DUCKING_RELEASE_MS = 300
+DUCKING_LEVEL_IN = 0.8
+MUSIC_WEIGHT = 0.5
+
+
+def load_stereo(path, sr=44100):
+    """Load an audio file as a float32 (2, samples) array at the given sample rate"""
+    audio, _ = librosa.load(str(path), sr=sr, mono=False)
+    audio = to_stereo(audio)
+    return audio[:2].astype(np.float32)
+
+
+def block_power(audio, block=CONTROL_BLOCK):
+    """Mean square of a (channels, samples) signal over consecutive blocks, averaged across channels"""
+    n_blocks = -(-audio.shape[-1] // block)
+    padded = np.zeros((audio.shape[0], n_blocks * block), dtype=np.float32)
+    padded[:, :audio.shape[-1]] = audio
+    return np.mean(padded.reshape(audio.shape[0], n_blocks, block) ** 2, axis=(0, 2))
+
+
+def envelope_follower(levels, sr, attack_ms, release_ms, block=CONTROL_BLOCK):
+    """
+    Smooth a control-rate level signal with separate attack and release times.
+
+    Uses the same one-pole coefficients as ffmpeg's agate/sidechaincompress
+    (1 / (time * sr)), converted from per-sample to per-block.
+    """
+    attack = 1 - (1 - min(1.0, 1000 / (attack_ms * sr))) ** block
+    release = 1 - (1 - min(1.0, 1000 / (release_ms * sr))) ** block
+    envelope = np.empty_like(levels)
+    state = 0.0
+    for i, level in enumerate(levels):
+        state += (level - state) * (attack if level > state else release)
+        envelope[i] = state
+    return envelope
+
+
+def block_gain_to_samples(gain, n_samples, block=CONTROL_BLOCK):
+    """Linearly interpolate a per-block gain curve to one value per sample"""
+    centres = np.arange(gain.size) * block + block / 2
+    return np.interp(np.arange(n_samples), centres, gain).astype(np.float32)
+
+
+def ducking_gain(sidechain, sr, ducking_ratio=2.5, ducking_threshold=0.015):
+    """
+    Per-sample gain for the background music, driven by the vocals.
+
+    Mirrors the ffmpeg graph: the vocals go through a downward gate
+    (agate), and the gated RMS level drives a compressor (sidechaincompress)
+    whose gain reduction is applied in full, like the filter's default mix of 1.
+    """
+    power = block_power(sidechain)
+
+    # Gate: attenuate the vocal level below the threshold so breaths and bleed do not duck the music
+    gate_level = np.sqrt(envelope_follower(power, sr, GATE_ATTACK_MS, GATE_RELEASE_MS))
+    gate_gain = np.ones_like(gate_level)
+    below = gate_level < GATE_THRESHOLD
+    gate_gain[below] = np.maximum((gate_level[below] / GATE_THRESHOLD) ** (GATE_RATIO - 1), GATE_RANGE)
+
+    # Compressor on the gated RMS level
+    level = np.sqrt(envelope_follower(power * gate_gain ** 2, sr, DUCKING_ATTACK_MS, DUCKING_RELEASE_MS))
+    gain = np.ones_like(level)
+    above = level > ducking_threshold
+    gain[above] = (level[above] / ducking_threshold) ** (1 / ducking_ratio - 1)
+    return block_gain_to_samples(gain, sidechain.shape[-1])
+
+
+def pad_to(audio, n_samples):
+    """Zero-pad a (channels, samples) array at the end to n_samples"""
+    return np.pad(audio, ((0, 0), (0, n_samples - audio.shape[-1])))
+
+
+def mix_with_ducking(vocals, other, music, sr=44100, vocals_volume=1.0, other_volume=0.9,
+                     music_volume=0.8, ducking_ratio=2.5, ducking_threshold=0.015):
+    """
+    Mix vocals, other instruments and background music with sidechain ducking, all in memory.
+
+    Follows the parameters and signal flow of mix_audio_with_ducking: the
+    music is compressed by the gated vocals, then the three signals are
+    summed with amix's normalized weights (1, 1, 0.5). Inputs are (channels,
+    samples) arrays at sr and are zero-padded to the longest one.
+
+    Returns:
+        numpy.ndarray: float32 (2, samples) mix.
+    """
+    vocals, other, music = (to_stereo(np.asarray(audio, dtype=np.float32))[:2] for audio in (vocals, other, music))
+    n_samples = max(vocals.shape[-1], other.shape[-1], music.shape[-1])
+    vocals, other, music = (pad_to(audio, n_samples) for audio in (vocals, other, music))
+
+    gain = ducking_gain(vocals, sr, ducking_ratio, ducking_threshold)
+    ducked_music = music * (music_volume * DUCKING_LEVEL_IN) * gain
+
+    weights = 1 + 1 + MUSIC_WEIGHT
+    return (vocals * vocals_volume + other * other_volume + ducked_music * MUSIC_WEIGHT) / weights
+
+
+def mix(vocals, other, vocals_volume=1.0, other_volume=0.9):
+    """In-memory equivalent of the two-input amix used when there is no background music"""
+    vocals, other = (to_stereo(np.asarray(audio, dtype=np.float32))[:2] for audio in (vocals, other))
+    n_samples = max(vocals.shape[-1], other.shape[-1])
+    return (pad_to(vocals, n_samples) * vocals_volume + pad_to(other, n_samples) * other_volume) / 2
+
+
+def mix_files(vocals_path, other_path, output_path, bg_music_path=None, sr=44100, **mix_params):
+    """
+    Load the stems, mix them with mix_with_ducking (or mix without background music) and write a 16-bit WAV.
+
+    mix_params are the volume and ducking keyword arguments of mix_with_ducking.
+    """
+    vocals = load_stereo(vocals_path, sr)
+    other = load_stereo(other_path, sr)
+    if bg_music_path:
+        mixed = mix_with_ducking(vocals, other, load_stereo(bg_music_path, sr), sr, **mix_params)
+    else:
+        mixed = mix(vocals, other, vocals_volume=mix_params.get('vocals_volume', 1.0),
+                    other_volume=mix_params.get('other_volume', 0.9))
+    sf.write(str(output_path), np.clip(mixed, -1.0, 1.0).T, sr, subtype='PCM_16')
@@ -0,0 +1,112 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import librosa
+
+PLOT_WIDTH_PX = 1600
+PLOT_HEIGHT_PX = 800
+PLOT_DPI = 100
+PLOT_N_FFT = 2048
+PLOT_DYNAMIC_RANGE_DB = 80
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = []
+
+
+def pitch_plot_data(audio, sr, f0, corrected_f0, hop_length, fmin, fmax, width_px=PLOT_WIDTH_PX,
+                    height_px=PLOT_HEIGHT_PX):
+    """
+    Everything the pitch correction plot needs, already reduced to the output resolution.
+
+    The spectrogram is computed with one STFT column per horizontal pixel
+    (a hop of len(audio) / width_px instead of the analysis hop) and resampled
+    to height_px log-spaced rows between fmin and fmax, so its cost depends
+    on the image size rather than on the length of the take. The pitch
+    contours come from the existing analysis.
+
+    Returns:
+        dict: spectrogram (height_px, columns) in dB, duration, fmin, fmax, and the f0 and corrected_f0
+        contours with their frame times.
+    """
+    plot_hop = max(hop_length, len(audio) // width_px)
+    magnitude = np.abs(librosa.stft(audio, n_fft=PLOT_N_FFT, hop_length=plot_hop))
+    # Nearest STFT bin for every log-spaced row
+    row_frequencies = np.geomspace(fmin, fmax, height_px)
+    bins = np.clip(np.round(row_frequencies * PLOT_N_FFT / sr).astype(int), 0, magnitude.shape[0] - 1)
+    spectrogram = librosa.amplitude_to_db(magnitude[bins], ref=np.max, top_db=PLOT_DYNAMIC_RANGE_DB)
+    return {
+        'spectrogram': spectrogram.astype(np.float32),
+        'duration': len(audio) / sr,
+        'fmin': fmin,
+        'fmax': fmax,
+        'times': librosa.frames_to_time(np.arange(len(f0)), sr=sr, hop_length=hop_length),
+        'f0': np.asarray(f0),
+        'corrected_f0': np.asarray(corrected_f0),
+    }
+
+
+def render_pitch_plot(path, data):
+    """Draw the spectrogram with the original and corrected pitch and save it as an image"""
+    # The object-oriented Agg API does not touch pyplot's global state, so it is safe off the main thread
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(PLOT_WIDTH_PX / PLOT_DPI, PLOT_HEIGHT_PX / PLOT_DPI), dpi=PLOT_DPI)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    # Rows are log-spaced, so the image is drawn on a log2(frequency) axis and labelled in notes
+    low, high = np.log2(data['fmin']), np.log2(data['fmax'])
+    img = ax.imshow(data['spectrogram'], origin='lower', aspect='auto', interpolation='nearest',
+                    extent=(0, data['duration'], low, high), cmap='magma')
+    fig.colorbar(img, ax=ax, format="%+2.f dB")
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ax.plot(data['times'], np.log2(data['f0']), label='original pitch', color='cyan', linewidth=2)
+        ax.plot(data['times'], np.log2(data['corrected_f0']), label='corrected pitch', color='orange', linewidth=1)
+    octaves = np.arange(np.ceil(librosa.hz_to_midi(data['fmin']) / 12), librosa.hz_to_midi(data['fmax']) / 12 + 1)
+    ticks = [librosa.midi_to_hz(12 * octave) for octave in octaves]
+    ax.set_yticks(np.log2(ticks))
+    ax.set_yticklabels([librosa.hz_to_note(tick) for tick in ticks])
+    ax.set_ylim(low, high)
+    ax.legend(loc='upper right')
+    ax.set_ylabel('Pitch')
+    ax.set_xlabel('Time [s]')
+    fig.savefig(str(path), bbox_inches='tight')
+
+
+def submit_pitch_plot(path, data):
+    """Render the plot on the background plotting thread and return its Future"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='plot')
+        future = _executor.submit(render_pitch_plot, path, data)
+        _pending.append((path, future))
+    return future
+
+
+def wait_for_plot(future):
+    """Block until one submitted plot is written; failures are logged, not raised"""
+    with _executor_lock:
+        pending = [(path, submitted) for path, submitted in _pending if submitted is future]
+        _pending[:] = [(path, submitted) for path, submitted in _pending if submitted is not future]
+    for path, submitted in pending:
+        _report_plot(path, submitted)
+
+
+def wait_for_plots():
+    """Block until all submitted plots are written, e.g. at shutdown; failures are logged, not raised"""
+    with _executor_lock:
+        pending = list(_pending)
+        _pending.clear()
+    for path, future in pending:
+        _report_plot(path, future)
+
+
+def _report_plot(path, future):
+    try:
+        future.result()
+        logging.info(f"Pitch correction plot saved to {path}")
+    except Exception as e:
+        logging.error(f"Failed to render pitch correction plot {path}: {str(e)}")
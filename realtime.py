@@ -0,0 +1,157 @@
+from collections import deque
+import numpy as np
+import librosa
+from pedalboard import Pedalboard
+from auto_tune import pitch_table, snap_to_table, SEMITONES_IN_OCTAVE
+from sound_effects import to_stereo, compressor, reverb, delay
+
+VOICING_THRESHOLD_DBFS = -45  # Analysis frames quieter than this are treated as unvoiced
+
+
+class RealtimeVocalProcessor:
+    """
+    Stateful, block-based vocal chain for monitoring: compression -> pitch correction -> reverb -> delay.
+
+    Every call to process() takes one block of block_size mono samples and
+    returns the processed stereo block; filter, reverb and delay tails and
+    the pitch shifter's history carry over to the next block. Pitch is
+    tracked with YIN on the last frame_length samples, snapped to the scale
+    through the same pitch tables as the offline chain, and shifted with a
+    two-tap delay-line shifter whose taps are crossfaded over shifter_window
+    samples. Frames that are unvoiced or already within tolerance_cents of
+    their target are crossfaded to a dry signal delayed by the same amount,
+    so the latency does not change with the correction.
+
+    Unlike VocalChain nothing is normalized, since the peak of the take is
+    not known in advance.
+
+    Parameters:
+        sr (int): Sample rate.
+        block_size (int): Samples per block, e.g. 256 to 1024.
+        scale (str or sequence): Key, custom pitch classes or None for chromatic correction.
+        note_mask (sequence): Pitch-class mask, see auto_tune.pitch_table.
+        compression_params (dict): Keyword arguments for sound_effects.compressor.
+        reverb_params (dict): Keyword arguments for sound_effects.reverb.
+        delay_params (dict): Keyword arguments for sound_effects.delay.
+        fmin (str): Lowest note of the singer's range.
+        fmax (str): Highest note of the singer's range.
+        frame_length (int): Pitch analysis frame in samples; must cover two periods of fmin.
+        shifter_window (int): Crossfade window of the pitch shifter in samples; half of it is latency.
+        tolerance_cents (float): Pitch deviation below which the dry signal is used.
+    """
+
+    def __init__(self, sr=44100, block_size=512, scale=None, note_mask=None, compression_params=None,
+                 reverb_params=None, delay_params=None, fmin='C2', fmax='C7', frame_length=2048,
+                 shifter_window=1024, tolerance_cents=5.0):
+        self.sr = sr
+        self.block_size = block_size
+        self.table = pitch_table(scale, note_mask)
+        self.fmin = librosa.note_to_hz(fmin)
+        self.fmax = librosa.note_to_hz(fmax)
+        self.frame_length = frame_length
+        self.window = shifter_window
+        self.tolerance_cents = tolerance_cents
+        self.compression_board = Pedalboard([compressor(**(compression_params or {}))])
+        self.space_board = Pedalboard([reverb(**(reverb_params or {})), delay(**(delay_params or {}))])
+
+        # Circular history of the compressed input, long enough for the analysis frame and the shifter taps
+        self._history_size = 1 << int(np.ceil(np.log2(frame_length + shifter_window + block_size)))
+        self.reset()
+
+    @property
+    def latency_samples(self):
+        """Algorithmic latency: one block of buffering plus the pitch shifter's nominal delay"""
+        return self.block_size + self.window // 2
+
+    @property
+    def latency_seconds(self):
+        return self.latency_samples / self.sr
+
+    def reset(self):
+        """Forget all state, e.g. between takes"""
+        self._history = np.zeros(self._history_size, dtype=np.float32)
+        self._written = 0
+        self._phase = 0.0
+        self._ratio = 1.0
+        self._wet = 0.0
+        self._targets = deque(maxlen=3)
+        self.compression_board.reset()
+        self.space_board.reset()
+
+    def track_pitch(self, frame):
+        """f0 of the latest analysis frame in Hz, or NaN when it is too quiet to be voiced"""
+        rms = np.sqrt(np.mean(frame ** 2))
+        if rms <= 0 or 20 * np.log10(rms) < VOICING_THRESHOLD_DBFS:
+            return np.nan
+        return librosa.yin(frame, fmin=self.fmin, fmax=self.fmax, sr=self.sr, frame_length=self.frame_length,
+                           center=False)[0]
+
+    def target_pitch(self, f0):
+        """Snap f0 to the scale, with the 3-point median smoothing of aclosest_pitch_from_scale over blocks"""
+        target = snap_to_table(np.array([f0]), self.table)[0]
+        self._targets.append(target)
+        recent = np.array(self._targets)
+        if np.isnan(target) or np.isnan(recent).any():
+            return target
+        return float(np.median(recent))
+
+    def process(self, block):
+        """
+        Process one block of block_size samples (mono, or (channels, samples) mixed down to mono).
+
+        Returns:
+            numpy.ndarray: float32 (2, block_size) output.
+        """
+        block = np.asarray(block, dtype=np.float32)
+        if block.ndim == 2:
+            block = block.mean(axis=0)
+        if block.shape[0] != self.block_size:
+            raise ValueError(f"Expected blocks of {self.block_size} samples, got {block.shape[0]}")
+        n = self.block_size
+
+        compressed = self.compression_board(block, self.sr, buffer_size=n, reset=False)
+        start = self._written
+        self._history[(start + np.arange(n)) % self._history_size] = compressed
+        self._written += n
+
+        frame = self._history[(self._written - self.frame_length + np.arange(self.frame_length)) % self._history_size]
+        f0 = self.track_pitch(frame)
+        target = self.target_pitch(f0)
+        ratio, wet = 1.0, 0.0
+        if not np.isnan(f0) and not np.isnan(target):
+            cents = SEMITONES_IN_OCTAVE * 100 * np.log2(target / f0)
+            if abs(cents) > self.tolerance_cents:
+                ratio, wet = target / f0, 1.0
+
+        shifted = self._shift(start, ratio)
+        dry = self._history[(start + np.arange(n) - self.window // 2) % self._history_size]
+        ramp = np.arange(1, n + 1, dtype=np.float32) / n
+        wets = self._wet + (wet - self._wet) * ramp
+        self._wet = wet
+        corrected = (wets * shifted + (1 - wets) * dry).astype(np.float32)
+
+        return self.space_board(to_stereo(corrected), self.sr, buffer_size=n, reset=False)
+
+    def _shift(self, start, ratio):
+        """
+        Delay-line pitch shifter: two read taps sweep through shifter_window at (1 - ratio) samples per sample,
+        half a window apart, each faded in and out with sin^2 so their gains always sum to 1.
+        """
+        n = self.block_size
+        # Glide the ratio across the block to avoid zipper noise
+        ratios = self._ratio + (ratio - self._ratio) * np.arange(1, n + 1) / n
+        phase = (self._phase + np.cumsum((1.0 - ratios) / self.window)) % 1.0
+        self._phase = phase[-1]
+        self._ratio = ratio
+
+        times = start + np.arange(n)
+        shifted = np.zeros(n)
+        for offset in (0.0, 0.5):
+            tap_phase = (phase + offset) % 1.0
+            position = times - tap_phase * self.window
+            index = np.floor(position).astype(np.int64)
+            fraction = position - index
+            x0 = self._history[index % self._history_size]
+            x1 = self._history[(index + 1) % self._history_size]
+            shifted += np.sin(np.pi * tap_phase) ** 2 * (x0 + fraction * (x1 - x0))
+        return shifted
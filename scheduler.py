@@ -0,0 +1,56 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+import instrumentation
+
+# Which shared resource each pipeline stage mostly uses
+STAGE_RESOURCES = {
+    'standardize': 'ffmpeg',
+    'extract': 'ffmpeg',
+    'separate': 'separation',
+    'pitch_analysis': 'pitch',
+    'vocals': 'pitch',
+    'mix': 'ffmpeg',
+    'render': 'ffmpeg',
+}
+
+
+class StageScheduler:
+    """
+    Limits how many jobs run each kind of stage at the same time and records per-stage timings.
+
+    Stages map to resources through STAGE_RESOURCES ('separation' for Demucs,
+    'pitch' for the vocal chain, 'ffmpeg' for encodes); each resource has its
+    own concurrency limit, so one video can be separated while others are
+    pitch-corrected or encoded. Resources without a limit are not throttled.
+    The time spent running (not waiting) is also reported to the active
+    instrumentation.RunProfiler, if any.
+
+    Parameters:
+        limits (dict): Maximum concurrent stages per resource, e.g. {'separation': 1, 'pitch': 4, 'ffmpeg': 2}.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = dict(limits or {})
+        self._semaphores = {resource: threading.BoundedSemaphore(limit) for resource, limit in self.limits.items()}
+        self._lock = threading.Lock()
+        self.timings = defaultdict(dict)
+
+    @contextmanager
+    def stage(self, job, name):
+        """Wait for the stage's resource, then time the wrapped block under timings[job][name]"""
+        semaphore = self._semaphores.get(STAGE_RESOURCES.get(name, name))
+        queued = time.perf_counter()
+        if semaphore is not None:
+            semaphore.acquire()
+        started = time.perf_counter()
+        try:
+            with instrumentation.stage(name):
+                yield
+        finally:
+            finished = time.perf_counter()
+            if semaphore is not None:
+                semaphore.release()
+            with self._lock:
+                self.timings[job][name] = {'wait': started - queued, 'run': finished - started}
@@ -8,6 +8,47 @@ import librosa
 import soundfile as sf
 from pedalboard import Pedalboard, Reverb, Delay, Compressor
 
+def to_stereo(audio):
+    """Duplicate a mono signal to two channels; multichannel (channels, samples) input is returned as is"""
+    if len(audio.shape) == 1:
+        audio = np.array([audio, audio])
+    return audio
+
+
+def normalize(audio):
+    """Scale audio so that its peak absolute value is 1"""
+    return audio / np.max(np.abs(audio))
+
+
+def compressor(threshold_db=-20, ratio=4, attack_ms=10, release_ms=100):
+    """Pedalboard Compressor with the parameters used by apply_compression"""
+    return Compressor(
+        threshold_db=threshold_db,
+        ratio=ratio,
+        attack_ms=attack_ms,
+        release_ms=release_ms
+    )
+
+
+def reverb(room_size=0.3, damping=0.3, wet_level=0.3, dry_level=0.7):
+    """Pedalboard Reverb with the parameters used by apply_reverb"""
+    return Reverb(
+        room_size=room_size,  # Controls the size of the virtual room
+        damping=damping,     # Controls high-frequency damping
+        wet_level=wet_level, # Level of the reverb effect
+        dry_level=dry_level  # Level of the original signal
+    )
+
+
+def delay(delay_time=0.5, feedback=0.5, wet_level=0.2):
+    """Pedalboard Delay with the parameters used by apply_delay"""
+    return Delay(
+        delay_seconds=delay_time,  # Delay time in seconds
+        feedback=feedback,          # Feedback amount
+        mix=wet_level               # Wet level of the delay
+    )
+
+
 def apply_reverb(input_file, output_file, room_size=0.3, damping=0.3, wet_level=0.3, dry_level=0.7):
     """
     Applies high-quality reverb to an audio file using Pedalboard.
@@ -24,27 +65,19 @@ def apply_reverb(input_file, output_file, room_size=0.3, damping=0.3, wet_level=
     audio, sr = librosa.load(input_file, sr=44100, mono=False)
     
     # If audio is mono, duplicate to stereo
-    if len(audio.shape) == 1:
-        audio = np.array([audio, audio])
+    audio = to_stereo(audio)
     
     # Normalize audio
-    audio = audio / np.max(np.abs(audio))
+    audio = normalize(audio)
     
     # Create a Pedalboard with Reverb
-    board = Pedalboard([
-        Reverb(
-            room_size=room_size,  # Controls the size of the virtual room
-            damping=damping,     # Controls high-frequency damping
-            wet_level=wet_level, # Level of the reverb effect
-            dry_level=dry_level  # Level of the original signal
-        )
-    ])
+    board = Pedalboard([reverb(room_size, damping, wet_level, dry_level)])
     
     # Apply reverb
     processed_audio = board(audio, sr)
     
     # Normalize output
-    processed_audio = processed_audio / np.max(np.abs(processed_audio))
+    processed_audio = normalize(processed_audio)
     
     # Save the result
     sf.write(output_file, processed_audio.T, sr, subtype='PCM_16')
@@ -65,26 +98,19 @@ def apply_delay(input_file, output_file, delay_time=0.5, feedback=0.5, wet_level
     audio, sr = librosa.load(input_file, sr=44100, mono=False)
     
     # If audio is mono, duplicate to stereo
-    if len(audio.shape) == 1:
-        audio = np.array([audio, audio])
+    audio = to_stereo(audio)
     
     # Normalize audio
-    audio = audio / np.max(np.abs(audio))
+    audio = normalize(audio)
     
     # Create a Pedalboard with Delay
-    board = Pedalboard([
-        Delay(
-            delay_seconds=delay_time,  # Delay time in seconds
-            feedback=feedback,          # Feedback amount
-            mix=wet_level               # Wet level of the delay
-        )
-    ])
+    board = Pedalboard([delay(delay_time, feedback, wet_level)])
     
     # Apply delay
     processed_audio = board(audio, sr)
     
     # Normalize output
-    processed_audio = processed_audio / np.max(np.abs(processed_audio))
+    processed_audio = normalize(processed_audio)
     
     # Save the result
     sf.write(output_file, processed_audio.T, sr, subtype='PCM_16')
@@ -106,24 +132,16 @@ def apply_compression(input_file, output_file, threshold_db=-20, ratio=4, attack
     audio, sr = librosa.load(input_file, sr=44100, mono=False)
     
     # If audio is mono, duplicate to stereo
-    if len(audio.shape) == 1:
-        audio = np.array([audio, audio])
+    audio = to_stereo(audio)
     
     # Create a Pedalboard with Compressor
-    board = Pedalboard([
-        Compressor(
-            threshold_db=threshold_db,
-            ratio=ratio,
-            attack_ms=attack_ms,
-            release_ms=release_ms
-        )
-    ])
+    board = Pedalboard([compressor(threshold_db, ratio, attack_ms, release_ms)])
     
     # Apply compression
     processed_audio = board(audio, sr)
     
     # Normalize output
-    processed_audio = processed_audio / np.max(np.abs(processed_audio))
+    processed_audio = normalize(processed_audio)
     
     # Save the result
     sf.write(output_file, processed_audio.T, sr, subtype='PCM_16')
\ No newline at end of file
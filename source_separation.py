@@ -1,19 +1,350 @@
+import copy
 import os
 from pathlib import Path
+from concurrent.futures import Future
+import queue
+import threading
+import time
 import torch
 import torchaudio
 import logging
+import numpy as np
+import soundfile as sf
+import instrumentation
+from video_audio_utils import stream_audio
 from demucs.pretrained import get_model
 from demucs.apply import apply_model
 
-def separate_sources(input_file, output_dir):
+# Named quality/speed trade-offs for separate_sources. 'quality' matches the original settings:
+# the 4-model htdemucs_ft bag with 2 random shifts, while 'fast' runs a single model in one pass.
+SEPARATION_PROFILES = {
+    'fast': {'model_name': 'htdemucs', 'shifts': 0, 'overlap': 0.1, 'pad_seconds': 0.5},
+    'balanced': {'model_name': 'htdemucs_ft', 'shifts': 0, 'overlap': 0.25, 'pad_seconds': 1.0},
+    'quality': {'model_name': 'htdemucs_ft', 'shifts': 2, 'overlap': 0.25, 'pad_seconds': 2.0},
+}
+
+# CPU inference settings every profile accepts: intra-op and inter-op torch thread counts (None keeps
+# torch's defaults) and an optional model optimization from MODEL_OPTIMIZATIONS. GPUs ignore them.
+CPU_INFERENCE_DEFAULTS = {'threads': None, 'interop_threads': None, 'optimization': None}
+MODEL_OPTIMIZATIONS = ('quantize', 'compile')
+
+# Output formats for the separated stems: file extension and torchaudio.save arguments
+STEM_FORMATS = {
+    'float': ('wav', {}),
+    'pcm16': ('wav', {'encoding': 'PCM_S', 'bits_per_sample': 16}),
+    'flac': ('flac', {'bits_per_sample': 16}),
+}
+
+# soundfile subtypes of the stem formats, for stems written window by window
+STEM_SUBTYPES = {'float': 'FLOAT', 'pcm16': 'PCM_16', 'flac': 'PCM_16'}
+
+_models = {}
+_models_lock = threading.Lock()
+
+def get_separation_profile(profile='quality'):
+    """
+    Resolve a separation profile to its settings.
+
+    profile is either a name from SEPARATION_PROFILES or a dict of settings; a
+    dict may name a base profile under 'profile' and override any of its keys,
+    including the CPU inference settings in CPU_INFERENCE_DEFAULTS.
+    """
+    if isinstance(profile, dict):
+        overrides = dict(profile)
+        settings = get_separation_profile(overrides.pop('profile', 'quality'))
+        unknown = set(overrides) - set(settings)
+        if unknown:
+            raise ValueError(f"Unknown separation settings: {sorted(unknown)}")
+        settings.update(overrides)
+        return settings
+    if profile not in SEPARATION_PROFILES:
+        raise ValueError(f"Unknown separation profile '{profile}', expected one of {sorted(SEPARATION_PROFILES)}")
+    return {**CPU_INFERENCE_DEFAULTS, **SEPARATION_PROFILES[profile]}
+
+def register_model(model_name, model):
+    """Make an already constructed model available to load_model under the given name, e.g. a small test model"""
+    with _models_lock:
+        _models[model_name] = model
+
+def configure_cpu_threads(threads=None, interop_threads=None):
+    """
+    Set torch's intra-op and inter-op thread pools for CPU inference.
+
+    The inter-op pool can only be sized before torch first runs parallel
+    work in the process; later requests are logged and ignored.
+    """
+    if threads and torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+    if interop_threads and torch.get_num_interop_threads() != interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            logging.warning(f"Cannot change the inter-op thread count after torch has started; "
+                            f"keeping {torch.get_num_interop_threads()}")
+
+def optimize_model(model, optimization):
+    """
+    Return a CPU-optimized copy of a Demucs model (or bag of models).
+
+    'quantize' applies dynamic int8 quantization to the Linear and LSTM layers.
+    'compile' wraps the forward of every sub-model with torch.compile; the
+    module classes are kept, since apply_model dispatches on them, which is
+    also why TorchScript is not offered.
+    """
+    if optimization == 'quantize':
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8)
+    if optimization == 'compile':
+        model = copy.deepcopy(model)
+        for sub_model in getattr(model, 'models', [model]):
+            sub_model.forward = torch.compile(sub_model.forward)
+        return model
+    raise ValueError(f"Unknown model optimization '{optimization}', expected one of {MODEL_OPTIMIZATIONS}")
+
+def load_model(model_name='htdemucs_ft', optimization=None):
+    """
+    Return the Demucs model, loading it and moving it to the device only on first use in this process.
+
+    With an optimization from MODEL_OPTIMIZATIONS the optimized copy is cached
+    next to the original; on a GPU the optimization is skipped.
+    """
+    if optimization is not None and torch.cuda.is_available():
+        logging.warning(f"Model optimization '{optimization}' is only used for CPU inference; ignoring it")
+        optimization = None
+    with _models_lock:
+        if model_name not in _models:
+            start = time.perf_counter()
+            # Will download the weights if not present
+            model = get_model(model_name)
+            model.cuda() if torch.cuda.is_available() else model.cpu()
+            model.eval()
+            _models[model_name] = model
+            logging.info(f"Loaded Demucs model {model_name} in {time.perf_counter() - start:.2f} s")
+        if optimization is None:
+            return _models[model_name]
+
+        key = f'{model_name}:{optimization}'
+        if key not in _models:
+            start = time.perf_counter()
+            _models[key] = optimize_model(_models[model_name], optimization)
+            logging.info(f"Prepared {optimization} {model_name} in {time.perf_counter() - start:.2f} s")
+        return _models[key]
+
+class SeparationWorker:
+    """
+    Long-lived separation worker that keeps the Demucs model loaded and processes queued jobs in order.
+
+    The model is loaded once when the worker starts; startup_time holds that
+    latency and job_times the wall time of every finished job, keyed by its
+    job_id (the input file if none was given), so the two can be reported
+    separately.
+    """
+
+    def __init__(self, profile='quality'):
+        self.profile = profile
+        self.settings = get_separation_profile(profile)
+        self.model_name = self.settings['model_name']
+        self.startup_time = None
+        self.job_times = {}
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='separation-worker', daemon=True)
+        self._thread.start()
+
+    def submit(self, input_file, output_dir, job_id=None, **separation_params):
+        """Queue a separation job and return a Future resolving to (vocals_path, other_path)"""
+        future = Future()
+        self._jobs.put((future, job_id or str(input_file), input_file, output_dir, separation_params))
+        return future
+
+    def close(self):
+        """Finish the queued jobs and stop the worker thread"""
+        self._jobs.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            if not torch.cuda.is_available():
+                configure_cpu_threads(self.settings['threads'], self.settings['interop_threads'])
+            load_model(self.model_name, self.settings['optimization'])
+        except Exception as e:
+            logging.error(f"Separation worker failed to load {self.model_name}: {str(e)}")
+        self.startup_time = time.perf_counter() - start
+        logging.info(f"Separation worker ready after {self.startup_time:.2f} s")
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            future, job_id, input_file, output_dir, separation_params = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            start = time.perf_counter()
+            try:
+                result = separate_sources(input_file, output_dir, profile=self.profile, **separation_params)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            job_time = time.perf_counter() - start
+            self.job_times[job_id] = job_time
+            logging.info(f"Separation job {input_file} finished in {job_time:.2f} s")
+
+def separate_tensor(model, wav, settings, vocals_only=False):
+    """
+    Run Demucs on a float32 (2, samples) tensor at 44.1 kHz and return the unpadded (vocals, other) stems on the CPU.
+
+    The signal is reflect-padded by the profile's pad_seconds first to prevent edge effects.
+    """
+    # Add small padding to prevent edge effects; reflect padding must be shorter than the signal
+    pad_length = min(int(44100 * settings['pad_seconds']), wav.shape[-1] - 1)
+    if pad_length > 0:
+        wav = torch.nn.functional.pad(wav, (pad_length, pad_length), mode='reflect')
+    else:
+        pad_length = 0
+    padded_length = wav.shape[-1]
+
+    with instrumentation.stage('demucs'):
+        sources = apply_model(model, wav.unsqueeze(0), progress=True, shifts=settings['shifts'], split=True,
+                              overlap=settings['overlap'])[0]
+    # Demucs returns sources in the order: drums, bass, other, vocals
+    # We only want vocals and a mix of everything else
+    if vocals_only:
+        # Copy out the unpadded vocals and drop the other three stems right away;
+        # the accompaniment is whatever of the mix is not vocals
+        vocals = sources[-1, :, pad_length:padded_length - pad_length].cpu().clone()
+        del sources
+        other = wav[:, pad_length:padded_length - pad_length].cpu() - vocals
+        return vocals, other
+
+    sources = sources.cpu()
+
+    # Extract vocals (last stem)
+    vocals = sources[-1]  # Get vocals (last source)
+
+    # Mix all other sources together for "other"
+    other = torch.sum(sources[:-1], dim=0)  # Sum all except vocals
+
+    # Remove padding
+    vocals = vocals[..., pad_length:padded_length - pad_length]
+    other = other[..., pad_length:padded_length - pad_length]
+    return vocals, other
+
+def overlapping_windows(blocks, window, overlap):
+    """
+    Regroup a stream of (channels, samples) blocks into windows of window samples, each overlapping the previous
+    one by overlap samples. The last window may be shorter; it is skipped if it only repeats the previous overlap.
+    """
+    buffer = None
+    emitted = False
+    for block in blocks:
+        buffer = block if buffer is None else np.concatenate([buffer, block], axis=1)
+        while buffer.shape[1] >= window:
+            yield buffer[:, :window]
+            emitted = True
+            buffer = buffer[:, window - overlap:]
+    if buffer is not None and (buffer.shape[1] > overlap or not emitted):
+        yield buffer
+
+def separate_windowed(model, input_file, output_paths, settings, vocals_only=False, stem_format='float',
+                      window_duration=60.0, overlap_duration=5.0):
+    """
+    Separate a long input window by window, streaming the stems to disk so memory does not grow with its length.
+
+    ffmpeg decodes the input (audio or video) to 44.1 kHz stereo float32
+    through a pipe, Demucs processes window_duration seconds at a time, and
+    consecutive windows are crossfaded linearly over overlap_duration, like
+    autotune_stream does, before being appended to the stem files. Unlike the
+    whole-file path the input is not peak-normalized, since the peak is only
+    known at the end; samples are clipped for integer formats instead.
+    """
+    sr = 44100
+    window = int(window_duration * sr)
+    overlap = int(overlap_duration * sr)
+    if not 0 < overlap < window:
+        raise ValueError("window_overlap must be positive and shorter than window_duration")
+    fade_in = torch.linspace(0.0, 1.0, overlap)
+    subtype = STEM_SUBTYPES[stem_format]
+    clip = subtype != 'FLOAT'
+
+    blocks = stream_audio(input_file, sr=sr, channels=2, block_size=window - overlap)
+    writers = {name: sf.SoundFile(path, 'w', samplerate=sr, channels=2, subtype=subtype)
+               for name, path in output_paths.items()}
+    try:
+        tails = None
+        with torch.inference_mode():
+            for samples in overlapping_windows(blocks, window, overlap):
+                wav = torch.nan_to_num(torch.from_numpy(np.array(samples)), nan=0.0, posinf=1.0, neginf=-1.0)
+                stems = dict(zip(('vocals', 'other'), separate_tensor(model, wav, settings, vocals_only)))
+                del wav
+                length = stems['vocals'].shape[-1]
+
+                if tails is not None:
+                    # The first `overlap` samples of this window cover the same audio as the previous tail
+                    n = min(overlap, length)
+                    for name, stem in stems.items():
+                        stem[:, :n] = tails[name][:, :n] * (1.0 - fade_in[:n]) + stem[:, :n] * fade_in[:n]
+
+                keep = max(length - overlap, 0)
+                tails = {name: stem[:, keep:].clone() for name, stem in stems.items()}
+                for name, stem in stems.items():
+                    writers[name].write(_stem_frames(stem[:, :keep], clip))
+            for name, tail in (tails or {}).items():
+                writers[name].write(_stem_frames(tail, clip))
+    except Exception as e:
+        logging.error(f"Error during windowed source separation: {str(e)}")
+        blocks.close()
+        for writer in writers.values():
+            writer.close()
+        for path in output_paths.values():
+            Path(path).unlink(missing_ok=True)
+        raise
+    for writer in writers.values():
+        writer.close()
+    return tuple(output_paths.values())
+
+def _stem_frames(stem, clip):
+    frames = stem.numpy().T
+    return np.clip(frames, -1.0, 1.0) if clip else frames
+
+def separate_sources(input_file, output_dir, profile='quality', vocals_only=False, stem_format='float', audio=None,
+                     window_duration=None, window_overlap=5.0):
+    """
+    Separate vocals from everything else with Demucs and save both stems as WAV files.
+
+    Parameters:
+        input_file (str): Path to the input audio file.
+        output_dir (str): Directory where the vocals_output and other_output stems are written.
+        profile (str or dict): Separation profile name from SEPARATION_PROFILES, or custom settings.
+        vocals_only (bool): Keep only the vocal stem from Demucs and write the accompaniment as
+            mix - vocals instead of summing the drums, bass and other stems.
+        stem_format (str): Stem file format from STEM_FORMATS ('float', 'pcm16' or 'flac').
+        audio (tuple): Already decoded (samples, sample_rate), samples shaped (channels, samples);
+            when given, input_file is not read.
+        window_duration (float): For long inputs, separate input_file in windows of this many seconds
+            and stream the stems to disk (see separate_windowed); None processes the whole file at once.
+        window_overlap (float): Crossfade between consecutive windows in seconds.
+
+    Returns:
+        tuple: (vocals_path, other_path)
+    """
+    settings = get_separation_profile(profile)
+    if stem_format not in STEM_FORMATS:
+        raise ValueError(f"Unknown stem format '{stem_format}', expected one of {sorted(STEM_FORMATS)}")
+    extension, save_args = STEM_FORMATS[stem_format]
+
     # Ensure the output directory exists
     os.makedirs(output_dir, exist_ok=True)
     
     # Define paths for the separated sources - only vocals and others
     source_names = ["vocals", "other"]
     output_paths = {
-        name: str(Path(output_dir) / f"{name}_output.wav")
+        name: str(Path(output_dir) / f"{name}_output.{extension}")
         for name in source_names
     }
     
@@ -21,16 +352,26 @@ def separate_sources(input_file, output_dir):
     if all(Path(path).exists() for path in output_paths.values()):
         return tuple(output_paths.values())
     
-    # Load the model (will download if not present)
-    model = get_model('htdemucs_ft')  # Using mdx model which is optimized for vocals separation
-    model.cuda() if torch.cuda.is_available() else model.cpu()
+    # Reuse the model already loaded in this process, if any
+    if not torch.cuda.is_available():
+        configure_cpu_threads(settings['threads'], settings['interop_threads'])
+    with instrumentation.stage('load_model'):
+        model = load_model(settings['model_name'], settings['optimization'])
+
+    if window_duration and audio is None:
+        return separate_windowed(model, input_file, output_paths, settings, vocals_only, stem_format,
+                                 window_duration, window_overlap)
     
     # Load and process audio with error handling
-    try:
-        wav, sr = torchaudio.load(input_file)
-    except Exception as e:
-        logging.error(f"Failed to load audio file: {str(e)}")
-        raise
+    if audio is not None:
+        wav, sr = audio
+        wav = torch.as_tensor(wav)
+    else:
+        try:
+            wav, sr = torchaudio.load(input_file)
+        except Exception as e:
+            logging.error(f"Failed to load audio file: {str(e)}")
+            raise
     
     # Ensure stereo audio (duplicate mono if necessary)
     if wav.shape[0] == 1:
@@ -54,31 +395,20 @@ def separate_sources(input_file, output_dir):
         wav = resampler(wav)
         sr = 44100
     
-    # Add small padding to prevent edge effects
-    pad_length = 44100 * 2  # 2 seconds of padding
-    wav = torch.nn.functional.pad(wav, (pad_length, pad_length), mode='reflect')
-    
-    # Separate
     try:
-        with torch.no_grad():
-            sources = apply_model(model, wav.unsqueeze(0), progress=True, shifts=2, split=True, overlap=0.25)[0]
-            # Demucs returns sources in the order: drums, bass, other, vocals
-            # We only want vocals and a mix of everything else
-            sources = sources.cpu()
-            
-            # Extract vocals (last stem)
-            vocals = sources[-1]  # Get vocals (last source)
-            
-            # Mix all other sources together for "other"
-            other = torch.sum(sources[:-1], dim=0)  # Sum all except vocals
-            
-            # Remove padding
-            vocals = vocals[..., pad_length:-pad_length]
-            other = other[..., pad_length:-pad_length]
-            
+        # inference_mode also skips the version counters and view tracking that no_grad keeps
+        with torch.inference_mode():
+            vocals, other = separate_tensor(model, wav, settings, vocals_only)
+            del wav
+
+            # Integer formats would wrap around on samples outside [-1, 1]
+            if save_args:
+                vocals = vocals.clamp(-1.0, 1.0)
+                other = other.clamp(-1.0, 1.0)
+
             # Save sources
-            torchaudio.save(output_paths["vocals"], vocals, sr)
-            torchaudio.save(output_paths["other"], other, sr)
+            torchaudio.save(output_paths["vocals"], vocals, sr, **save_args)
+            torchaudio.save(output_paths["other"], other, sr, **save_args)
             
             return tuple(output_paths.values())
     except Exception as e:
@@ -0,0 +1,228 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+MANIFEST_NAME = 'manifest.json'
+HASH_CHUNK_SIZE = 1 << 20
+
+
+class StageEntry:
+    """
+    One cached stage result: a directory named after the hash of the stage's inputs, parameters and code.
+
+    Use it as a context manager: when the block finishes without an exception
+    on a cache miss, the outputs written into the entry directory are recorded
+    in the manifest; if it raises, or an output requested with path() was not
+    written, the partial outputs are removed. A miss holds the entry's key
+    lock until the block ends, so another job asking for the same entry waits
+    and then finds it as a hit instead of clearing the directory mid-write.
+    """
+
+    def __init__(self, cache, stage, key, params):
+        self.cache = cache
+        self.stage = stage
+        self.key = key
+        self.params = params
+        self.dir = cache.root / stage / key
+        self._outputs = []
+        self.hit = cache._is_complete(self)
+
+    def path(self, file_name):
+        """Path of an output file inside the entry directory"""
+        output = self.dir / file_name
+        self._outputs.append(output)
+        return output
+
+    def __enter__(self):
+        lock = self.cache._key_lock(self)
+        lock.acquire()
+        # Another job may have finished this entry while we waited for the lock
+        self.hit = self.cache._is_complete(self)
+        if self.hit:
+            lock.release()
+            logging.info(f"Stage cache hit: {self.stage} ({self.key[:12]})")
+            self.cache._touch(self)
+        else:
+            logging.info(f"Stage cache miss: {self.stage} ({self.key[:12]})")
+            try:
+                shutil.rmtree(self.dir, ignore_errors=True)
+                self.dir.mkdir(parents=True)
+            except BaseException:
+                lock.release()
+                raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.hit:
+            return
+        try:
+            missing = [str(output) for output in self._outputs if not output.exists()]
+            if exc_type is None and not missing:
+                self.cache._record(self)
+                return
+            shutil.rmtree(self.dir, ignore_errors=True)
+            if exc_type is None:
+                raise RuntimeError(f"Stage {self.stage} did not produce {', '.join(missing)}")
+        finally:
+            self.cache._key_lock(self).release()
+
+
+class StageCache:
+    """
+    Content-addressed cache for pipeline stage outputs.
+
+    A stage result is keyed on the content hash of its input files, its
+    parameters and the source code of the modules that implement it, so a
+    parameter change only reruns that stage and the ones downstream of it
+    (their inputs change too). The manifest also memoizes file hashes by path,
+    size and mtime so large videos are not re-hashed on every run.
+
+    Parameters:
+        root (str): Cache directory.
+        max_size_gb (float): Evict least recently used entries above this total size (None disables).
+        max_age_days (float): Evict entries not used for this many days (None disables).
+    """
+
+    def __init__(self, root='.stage_cache', max_size_gb=None, max_age_days=None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_size_gb = max_size_gb
+        self.max_age_days = max_age_days
+        self._lock = threading.RLock()
+        self._key_locks = {}
+        self._manifest = self._load_manifest()
+
+    def stage(self, stage, inputs=(), params=None, code=()):
+        """
+        Return the StageEntry for a stage run.
+
+        Parameters:
+            stage (str): Stage name, also the subdirectory of the cache.
+            inputs (list): Input file paths; their content is hashed (None entries are skipped).
+            params (dict): JSON-serializable stage parameters.
+            code (list): Modules, functions or source paths whose code the stage depends on.
+        """
+        digest = hashlib.sha256()
+        digest.update(stage.encode())
+        for input_path in inputs:
+            if input_path is not None:
+                digest.update(self.file_hash(input_path).encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        for obj in code:
+            digest.update(self.file_hash(obj if isinstance(obj, (str, Path)) else inspect.getsourcefile(obj)).encode())
+        return StageEntry(self, stage, digest.hexdigest(), params)
+
+    def file_hash(self, path):
+        """SHA-256 of a file's content, memoized on path, size and mtime"""
+        path = Path(path).resolve()
+        stat = path.stat()
+        with self._lock:
+            known = self._manifest['file_hashes'].get(str(path))
+            if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                return known['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+        with self._lock:
+            self._manifest['file_hashes'][str(path)] = {
+                'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()
+            }
+            self._save_manifest()
+        return digest.hexdigest()
+
+    def export(self, cached_path, destination):
+        """Hard-link (or copy, across file systems) a cached output to a location outside the cache"""
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        if destination.exists():
+            destination.unlink()
+        try:
+            os.link(cached_path, destination)
+        except OSError:
+            shutil.copy2(cached_path, destination)
+        return destination
+
+    def evict(self):
+        """Remove entries older than max_age_days, then least recently used ones until under max_size_gb"""
+        with self._lock:
+            entries = self._manifest['entries']
+            now = time.time()
+            if self.max_age_days is not None:
+                for name, entry in list(entries.items()):
+                    if now - entry['last_used'] > self.max_age_days * 86400:
+                        self._remove(name)
+
+            if self.max_size_gb is not None:
+                max_size = self.max_size_gb * 2 ** 30
+                total = sum(entry['size'] for entry in entries.values())
+                for name, entry in sorted(entries.items(), key=lambda item: item[1]['last_used']):
+                    if total <= max_size:
+                        break
+                    total -= entry['size']
+                    self._remove(name)
+
+            # Forget hashes of files that no longer exist
+            hashes = self._manifest['file_hashes']
+            for path in [path for path in hashes if not Path(path).exists()]:
+                del hashes[path]
+            self._save_manifest()
+
+    def _remove(self, name):
+        logging.info(f"Evicting stage cache entry {name}")
+        shutil.rmtree(self.root / name, ignore_errors=True)
+        del self._manifest['entries'][name]
+
+    def _key_lock(self, entry):
+        """Lock held while an entry is being written, shared by every StageEntry with the same stage and key"""
+        with self._lock:
+            return self._key_locks.setdefault(f'{entry.stage}/{entry.key}', threading.Lock())
+
+    def _is_complete(self, entry):
+        with self._lock:
+            recorded = self._manifest['entries'].get(f'{entry.stage}/{entry.key}')
+        return recorded is not None and all((entry.dir / name).exists() for name in recorded['files'])
+
+    def _touch(self, entry):
+        with self._lock:
+            self._manifest['entries'][f'{entry.stage}/{entry.key}']['last_used'] = time.time()
+            self._save_manifest()
+
+    def _record(self, entry):
+        files = [path for path in entry.dir.rglob('*') if path.is_file()]
+        now = time.time()
+        with self._lock:
+            self._manifest['entries'][f'{entry.stage}/{entry.key}'] = {
+                'stage': entry.stage,
+                'params': entry.params,
+                'files': [str(path.relative_to(entry.dir)) for path in files],
+                'size': sum(path.stat().st_size for path in files),
+                'created': now,
+                'last_used': now,
+            }
+            self._save_manifest()
+
+    def _load_manifest(self):
+        manifest_path = self.root / MANIFEST_NAME
+        if manifest_path.exists():
+            try:
+                with open(manifest_path, 'r') as f:
+                    return json.load(f)
+            except json.JSONDecodeError:
+                logging.warning(f"Ignoring corrupt stage cache manifest {manifest_path}")
+        return {'entries': {}, 'file_hashes': {}}
+
+    def _save_manifest(self):
+        manifest_path = self.root / MANIFEST_NAME
+        temporary_path = manifest_path.with_suffix('.tmp')
+        with open(temporary_path, 'w') as f:
+            json.dump(self._manifest, f, indent=2, default=str)
+        os.replace(temporary_path, manifest_path)
@@ -1,13 +1,125 @@
+import json
+import logging
+import os
 import subprocess
+import threading
 from pathlib import Path
+import numpy as np
 
 def extract_audio_from_video(video_file, output_audio_file):
     subprocess.run([
-        'ffmpeg', '-i', str(video_file), '-q:a', '0', '-map', 'a', str(output_audio_file)
-    ])
+        'ffmpeg', '-i', str(video_file), '-q:a', '0', '-map', 'a', '-y', str(output_audio_file)
+    ], check=True)
 
-import subprocess
-from pathlib import Path
+def load_audio_from_video(video_file, sr=44100, channels=2):
+    """
+    Decode the audio track of a video straight into memory, without an intermediate file.
+
+    ffmpeg resamples to sr and converts to the requested channel count itself
+    and streams raw float32 PCM through a pipe.
+
+    Returns:
+        numpy.ndarray: float32 samples shaped (channels, samples).
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails; its stderr is attached and logged.
+    """
+    cmd = [
+        'ffmpeg', '-v', 'error', '-i', str(video_file), '-map', 'a:0', '-vn',
+        '-ac', str(channels), '-ar', str(sr), '-f', 'f32le', '-acodec', 'pcm_f32le', 'pipe:1'
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        stderr = result.stderr.decode(errors='replace').strip()
+        logging.error(f"ffmpeg failed to decode audio from {video_file}: {stderr}")
+        raise subprocess.CalledProcessError(result.returncode, cmd, output=None, stderr=stderr)
+    samples = np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, channels)
+    return np.ascontiguousarray(samples.T)
+
+def stream_audio(path, sr=44100, channels=2, block_size=44100):
+    """
+    Decode the audio of a video or audio file through an ffmpeg pipe, block_size samples at a time.
+
+    Like load_audio_from_video, but only one block is held in memory, so
+    arbitrarily long inputs can be processed incrementally.
+
+    Yields:
+        numpy.ndarray: float32 blocks shaped (channels, samples); the last one may be shorter.
+
+    Raises:
+        subprocess.CalledProcessError: If ffmpeg fails; its stderr is attached and logged.
+    """
+    cmd = [
+        'ffmpeg', '-v', 'error', '-i', str(path), '-map', 'a:0', '-vn',
+        '-ac', str(channels), '-ar', str(sr), '-f', 'f32le', '-acodec', 'pcm_f32le', 'pipe:1'
+    ]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            data = process.stdout.read(block_size * channels * 4)
+            if not data:
+                break
+            yield np.frombuffer(data, dtype=np.float32).reshape(-1, channels).T
+    except GeneratorExit:
+        # The consumer stopped early
+        process.kill()
+        raise
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read().decode(errors='replace').strip()
+        process.stderr.close()
+        returncode = process.wait()
+    if returncode != 0:
+        logging.error(f"ffmpeg failed to decode audio from {path}: {stderr}")
+        raise subprocess.CalledProcessError(returncode, cmd, output=None, stderr=stderr)
+
+_scaled_logo_lock = threading.Lock()
+
+# ffprobe results, keyed by resolved path and checked against mtime and size; persisted across runs
+# in PROBE_CACHE_NAME inside the directory given to set_probe_cache_dir (the stage cache root)
+PROBE_CACHE_NAME = 'ffprobe.json'
+_probe_cache = None
+_probe_cache_file = None
+_probe_cache_lock = threading.Lock()
+
+# Encoder settings for the video renders. 'final' matches the original hard-coded settings;
+# threads=0 lets ffmpeg pick; batch.run_batch replaces it with cpu_count // the ffmpeg limit so
+# encodes running side by side do not each use every core.
+RENDER_PROFILES = {
+    'draft': {'preset': 'ultrafast', 'crf': 30, 'threads': 0, 'audio_bitrate': '128k'},
+    'fast': {'preset': 'veryfast', 'crf': 23, 'threads': 0, 'audio_bitrate': '192k'},
+    'final': {'preset': 'medium', 'crf': 23, 'threads': 0, 'audio_bitrate': '192k'},
+}
+
+def get_render_profile(profile='final', profiles=None):
+    """
+    Resolve a render profile to its encoder settings.
+
+    profile is a name looked up in profiles (merged over RENDER_PROFILES) or a
+    dict of settings; a dict may name a base profile under 'profile'.
+    """
+    known_profiles = {**RENDER_PROFILES, **(profiles or {})}
+    if isinstance(profile, dict):
+        overrides = dict(profile)
+        settings = get_render_profile(overrides.pop('profile', 'final'), profiles)
+        settings.update(overrides)
+        return settings
+    if profile not in known_profiles:
+        raise ValueError(f"Unknown render profile '{profile}', expected one of {sorted(known_profiles)}")
+    return {**RENDER_PROFILES['final'], **known_profiles[profile]}
+
+def encoder_args(render_profile='final', copy_audio=False):
+    """ffmpeg output arguments for an H.264/AAC render with the given profile"""
+    settings = get_render_profile(render_profile)
+    audio_args = ['-c:a', 'copy'] if copy_audio else ['-c:a', 'aac', '-b:a', settings['audio_bitrate']]
+    return [
+        '-c:v', 'libx264',
+        '-preset', settings['preset'],
+        '-crf', str(settings['crf']),
+        '-threads', str(settings['threads']),
+        *audio_args,
+        '-movflags', '+faststart',  # Put the index first so the file can start playing while downloading
+    ]
 
 def scale_logo(logo_path, scaled_logo_path, max_logo_width=200):
     """
@@ -16,21 +128,33 @@ def scale_logo(logo_path, scaled_logo_path, max_logo_width=200):
     subprocess.run([
         'ffmpeg', '-i', str(logo_path),
         '-vf', f'scale=w={max_logo_width}:h=-1',
-        str(scaled_logo_path)
-    ])
+        '-y', str(scaled_logo_path)
+    ], check=True)
 
+def cached_scaled_logo(logo_path, max_logo_width=200):
+    """
+    Return the logo scaled to max_logo_width, scaling it only when the cached copy is missing or older than the logo.
+
+    The scaled copy is stored next to the logo as <name>_scaled_<width><ext>.
+    """
+    logo_path = Path(logo_path)
+    scaled_logo_path = logo_path.with_name(f'{logo_path.stem}_scaled_{max_logo_width}{logo_path.suffix}')
+    with _scaled_logo_lock:
+        if not scaled_logo_path.exists() or scaled_logo_path.stat().st_mtime < logo_path.stat().st_mtime:
+            temporary_path = scaled_logo_path.with_name(f'{scaled_logo_path.stem}.tmp{logo_path.suffix}')
+            scale_logo(logo_path, temporary_path, max_logo_width)
+            os.replace(temporary_path, scaled_logo_path)
+    return scaled_logo_path
 
-def add_audio_to_video(video_file, audio_file, output_video_file, fade_duration=3, logo_path=None):
+
+def add_audio_to_video(video_file, audio_file, output_video_file, fade_duration=3, logo_path=None,
+                       render_profile='final'):
     # Get video duration for accurate fade timing
-    video_duration = float(subprocess.check_output([
-        'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-        '-of', 'default=noprint_wrappers=1:nokey=1', str(video_file)
-    ]).decode().strip())
+    video_duration = probe_media(video_file)['duration']
     
     # Check if logo scaling is needed
-    scaled_logo_path = "scaled_logo.jpg"
     if logo_path and Path(logo_path).exists():
-        scale_logo(logo_path, scaled_logo_path)
+        scaled_logo_path = str(cached_scaled_logo(logo_path))
         filter_complex = (
             f'[0:v]fade=t=in:st=0:d={fade_duration},'
             f'fade=t=out:st={video_duration-fade_duration}:d={fade_duration}[vfade];'
@@ -56,11 +180,7 @@ def add_audio_to_video(video_file, audio_file, output_video_file, fade_duration=
         '-filter_complex', filter_complex,
         '-map', '[v]',
         '-map', '[audio]',
-        '-c:v', 'libx264',
-        '-preset', 'medium',
-        '-crf', '23',
-        '-c:a', 'aac',
-        '-b:a', '192k',
+        *encoder_args(render_profile),
         str(output_video_file)
     ])
 
@@ -119,24 +239,93 @@ def mix_audio_with_ducking(vocals_path, other_path, bg_music_path, output_path,
         '-ar', '44100',    # Set sample rate
         '-y',
         str(output_path)
-    ])
+    ], check=True)
 
 def get_video_dimensions(video_path):
     """Get the width and height of a video file"""
-    cmd = [
-        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
-        '-show_entries', 'stream=width,height',
-        '-of', 'csv=s=x:p=0', str(video_path)
-    ]
-    dimensions = subprocess.check_output(cmd).decode().strip().split('x')
-    return int(dimensions[0]), int(dimensions[1])
+    metadata = probe_media(video_path)
+    return metadata['width'], metadata['height']
+
+def probe_video(video_path):
+    """Get the width, height and duration of a video file"""
+    metadata = probe_media(video_path)
+    return metadata['width'], metadata['height'], metadata['duration']
 
-def standardize_video_dimensions(input_video, output_video, target_width=720, target_height=1280):
+def set_probe_cache_dir(directory):
+    """Persist probe_media results as PROBE_CACHE_NAME in directory, next to the stage cache manifest"""
+    global _probe_cache, _probe_cache_file
+    probe_cache_file = Path(directory) / PROBE_CACHE_NAME
+    with _probe_cache_lock:
+        if probe_cache_file != _probe_cache_file:
+            _probe_cache_file = probe_cache_file
+            _probe_cache = None
+
+def probe_media(path):
     """
-    Crop/pad and scale video to target dimensions while maintaining aspect ratio
+    Return the stream metadata of a media file, running ffprobe at most once per file version.
+
+    All streams and the container are probed in one call. The summary is
+    cached in memory and, once set_probe_cache_dir was called, on disk, and
+    it is reused as long as the file's mtime and size are unchanged.
+
+    Returns:
+        dict: duration, width, height, video_codec, sample_rate, channels and audio_codec
+            (None for a stream type the file does not have).
+    """
+    global _probe_cache
+    path = Path(path).resolve()
+    stat = path.stat()
+    with _probe_cache_lock:
+        if _probe_cache is None:
+            _probe_cache = _load_probe_cache()
+        cached = _probe_cache.get(str(path))
+        if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+            return cached['metadata']
+
+    output = subprocess.check_output([
+        'ffprobe', '-v', 'error', '-show_streams', '-show_format', '-of', 'json', str(path)
+    ])
+    info = json.loads(output)
+    video = next((stream for stream in info.get('streams', []) if stream.get('codec_type') == 'video'), {})
+    audio = next((stream for stream in info.get('streams', []) if stream.get('codec_type') == 'audio'), {})
+    duration = info.get('format', {}).get('duration') or video.get('duration') or audio.get('duration')
+    metadata = {
+        'duration': float(duration) if duration is not None else None,
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'video_codec': video.get('codec_name'),
+        'sample_rate': int(audio['sample_rate']) if 'sample_rate' in audio else None,
+        'channels': audio.get('channels'),
+        'audio_codec': audio.get('codec_name'),
+    }
+
+    with _probe_cache_lock:
+        _probe_cache[str(path)] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'metadata': metadata}
+        _save_probe_cache(_probe_cache)
+    return metadata
+
+def _load_probe_cache():
+    if _probe_cache_file is not None and _probe_cache_file.exists():
+        try:
+            with open(_probe_cache_file, 'r') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            logging.warning(f"Ignoring corrupt ffprobe cache {_probe_cache_file}")
+    return {}
+
+def _save_probe_cache(cache):
+    if _probe_cache_file is None:
+        return
+    _probe_cache_file.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = _probe_cache_file.with_suffix('.tmp')
+    with open(temporary_path, 'w') as f:
+        json.dump(cache, f, indent=2)
+    os.replace(temporary_path, _probe_cache_file)
+
+def scale_crop_filter(current_width, current_height, target_width=720, target_height=1280):
+    """
+    Return the ffmpeg filter that scales and center-crops a video to the target dimensions
     """
-    current_width, current_height = get_video_dimensions(input_video)
-    
     # Calculate scaling and cropping parameters
     current_ratio = current_width / current_height
     target_ratio = target_width / target_height
@@ -146,17 +335,68 @@ def standardize_video_dimensions(input_video, output_video, target_width=720, ta
         scale_height = target_height
         scale_width = int(current_width * (target_height / current_height))
         crop_x = (scale_width - target_width) // 2
-        filter_complex = f'scale={scale_width}:{scale_height},crop={target_width}:{target_height}:{crop_x}:0'
+        return f'scale={scale_width}:{scale_height},crop={target_width}:{target_height}:{crop_x}:0'
     else:
         # Video is too tall, need to crop height
         scale_width = target_width
         scale_height = int(current_height * (target_width / current_width))
         crop_y = (scale_height - target_height) // 2
-        filter_complex = f'scale={scale_width}:{scale_height},crop={target_width}:{target_height}:0:{crop_y}'
+        return f'scale={scale_width}:{scale_height},crop={target_width}:{target_height}:0:{crop_y}'
+
+def standardize_video_dimensions(input_video, output_video, target_width=720, target_height=1280,
+                                 render_profile='final'):
+    """
+    Crop/pad and scale video to target dimensions while maintaining aspect ratio
+    """
+    current_width, current_height = get_video_dimensions(input_video)
+    filter_complex = scale_crop_filter(current_width, current_height, target_width, target_height)
     
     subprocess.run([
         'ffmpeg', '-i', str(input_video),
         '-vf', filter_complex,
-        '-c:a', 'copy',
+        *encoder_args(render_profile, copy_audio=True),
         '-y', str(output_video)
-    ])
\ No newline at end of file
+    ])
+
+def render_video(video_file, audio_file, output_video_file, target_width=720, target_height=1280,
+                 fade_duration=3, logo_path=None, render_profile='final'):
+    """
+    Scale/crop the source video, apply fades and the logo overlay and mux the new audio in one encode.
+
+    Does the work of standardize_video_dimensions followed by add_audio_to_video,
+    but decodes and encodes the video only once and probes it only once.
+    """
+    current_width, current_height, video_duration = probe_video(video_file)
+    fade_out_start = video_duration - fade_duration
+
+    video_filter = (
+        f'[0:v]{scale_crop_filter(current_width, current_height, target_width, target_height)},'
+        f'fade=t=in:st=0:d={fade_duration},'
+        f'fade=t=out:st={fade_out_start}:d={fade_duration}'
+    )
+    audio_filter = (
+        f'[1:a]afade=t=in:st=0:d={fade_duration},'
+        f'afade=t=out:st={fade_out_start}:d={fade_duration}[audio]'
+    )
+    input_args = ['-i', str(video_file), '-i', str(audio_file)]
+
+    if logo_path and Path(logo_path).exists():
+        input_args += ['-i', str(cached_scaled_logo(logo_path))]
+        filter_complex = (
+            f'{video_filter}[vfade];'
+            '[2:v]format=rgba[logo];'
+            '[vfade][logo]overlay=x=main_w-overlay_w-20:y=main_h-overlay_h-20[v];'  # Position logo at bottom-right
+            f'{audio_filter}'
+        )
+    else:
+        filter_complex = f'{video_filter}[v];{audio_filter}'
+
+    subprocess.run([
+        'ffmpeg',
+        *input_args,
+        '-filter_complex', filter_complex,
+        '-map', '[v]',
+        '-map', '[audio]',
+        *encoder_args(render_profile),
+        '-y', str(output_video_file)
+    ], check=True)
\ No newline at end of file
@@ -0,0 +1,94 @@
+from pathlib import Path
+import numpy as np
+import soundfile as sf
+from pedalboard import Pedalboard
+import instrumentation
+from auto_tune import analyze_pitch, autotune
+from plotting import submit_pitch_plot
+from sound_effects import to_stereo, normalize, compressor, reverb, delay
+
+
+class VocalChain:
+    """
+    In-memory vocal chain: compression -> pitch correction -> reverb -> delay.
+
+    Produces the same result as running apply_compression, autotune,
+    apply_reverb and apply_delay one after the other, but keeps the audio in a
+    single NumPy buffer instead of decoding and re-encoding a file at every
+    step. The pedalboards are built once and reused for every call, and
+    reverb and delay share one board: both are linear, so the normalization
+    the file-based path does between them only changes the overall gain,
+    which the final normalization removes.
+
+    Parameters:
+        correction_function (callable): Maps an f0 array to the target pitch array.
+        compression_params (dict): Keyword arguments for sound_effects.compressor.
+        reverb_params (dict): Keyword arguments for sound_effects.reverb.
+        delay_params (dict): Keyword arguments for sound_effects.delay.
+        pitch_tracking_params (dict): Keyword arguments for auto_tune.autotune
+            (pitch_tracker, fmin, fmax, n_workers).
+        plot (bool): Save the pitch correction plot.
+        plot_path (str): Where the pitch correction plot is written; plot_future holds the Future of the
+            plot submitted by the last call.
+    """
+
+    def __init__(self, correction_function, compression_params=None, reverb_params=None, delay_params=None,
+                 pitch_tracking_params=None, plot=False, plot_path='pitch_correction.png'):
+        self.correction_function = correction_function
+        self.pitch_tracking_params = pitch_tracking_params or {}
+        self.plot = plot
+        self.plot_path = plot_path
+        self.plot_future = None
+        self.compression_board = Pedalboard([compressor(**(compression_params or {}))])
+        self.space_board = Pedalboard([reverb(**(reverb_params or {})), delay(**(delay_params or {}))])
+
+    def compress(self, audio, sr):
+        """Normalized, compressed stereo version of a (channels, samples) or mono vocal buffer"""
+        audio = to_stereo(np.asarray(audio, dtype=np.float32))
+        with instrumentation.stage('compression'):
+            return normalize(self.compression_board(audio, sr))
+
+    def analyze(self, audio, sr):
+        """
+        Pitch analysis of the signal the chain pitch-corrects (the compressed mono mix).
+
+        The result does not depend on the correction function, so it can be
+        saved with auto_tune.save_pitch_analysis and passed back to __call__
+        for every scale or correction method rendered from the same take.
+        """
+        compressed = self.compress(audio, sr)
+        params = {key: value for key, value in self.pitch_tracking_params.items()
+                  if key in ('pitch_tracker', 'fmin', 'fmax', 'n_workers')}
+        return analyze_pitch(np.mean(compressed, axis=0), sr, **params)
+
+    def __call__(self, audio, sr, debug_dir=None, debug_stem='vocals', analysis=None):
+        """
+        Process a (channels, samples) or mono vocal buffer and return the stereo result.
+
+        When debug_dir is given, the compressed and pitch-corrected intermediates
+        are written there as 16-bit WAVs, named like the files of the file-based chain.
+        analysis is an optional result of analyze() for the same audio, which skips pitch tracking.
+        """
+        compressed = self.compress(audio, sr)
+        self._write_debug(debug_dir, f'{debug_stem}_compressed.wav', compressed, sr)
+
+        # Pitch correction works on the mono mix, like librosa.load(..., mono=True)
+        with instrumentation.stage('autotune'):
+            pitch_corrected = autotune(np.mean(compressed, axis=0), sr, self.correction_function, plot=self.plot,
+                                       on_plot=self._submit_plot,
+                                       analysis=analysis, **self.pitch_tracking_params)
+        pitch_corrected = pitch_corrected.astype(np.float32)
+        self._write_debug(debug_dir, f'{debug_stem}_compressed_pitch_corrected.wav', pitch_corrected, sr)
+
+        with instrumentation.stage('reverb_delay'):
+            processed = self.space_board(normalize(to_stereo(pitch_corrected)), sr)
+            return normalize(processed)
+
+    def _submit_plot(self, data):
+        self.plot_future = submit_pitch_plot(self.plot_path, data)
+
+    @staticmethod
+    def _write_debug(debug_dir, file_name, audio, sr):
+        if debug_dir is None:
+            return
+        sf.write(str(Path(debug_dir) / file_name), np.asarray(audio).T, sr, subtype='PCM_16')